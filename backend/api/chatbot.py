@@ -1,7 +1,6 @@
 # backend/api/chatbot.py
 
 from fastapi import APIRouter, HTTPException
-from services.gemini_service import ask_gemini
 
 router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
@@ -16,6 +15,8 @@ def ask_chatbot(payload: dict):
     if not context:
         raise HTTPException(status_code=400, detail="Context is required")
 
+    # The Gemini client is configured on import; do it on first use
+    from services.gemini_service import ask_gemini
     answer = ask_gemini(question, context)
 
     return {
@@ -24,8 +24,7 @@ Produces:
 from typing import Dict, Any
 from fastapi import HTTPException
 
-from services.cost_engine import calculate_costs
-
+from services.sor_registry import get_registry, resolve_catalog
 
 
 def compute_cost_controller(estimation_output: Dict[str, Any]) -> Dict[str, Any]:
@@ -62,9 +61,18 @@ def compute_cost_controller(estimation_output: Dict[str, Any]) -> Dict[str, Any]
         }
 
 
-    # Run cost calculation
+    # Only a bad catalog selector is the caller's fault; errors from
+    # costing itself are server errors
+    try:
+        catalog = resolve_catalog(estimation_output.get("catalog"))
+        get_registry().csv_path(catalog)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid SOR catalog: {e}")
+
+    # Run cost calculation (pandas / rapidfuzz load on the first request)
+    from services.cost_engine import calculate_costs
     try:
-        cost_data = calculate_costs(materials)
+        cost_data = calculate_costs(materials, catalog=catalog)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to compute cost: {e}")
 
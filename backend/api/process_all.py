@@ -1,34 +1,65 @@
 # backend/api/process_all.py
 
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
-import os
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+import json
 
-from services.estimation_service import EstimationService
-from services.cost_engine import calculate_costs
-from services.demographics_service import DemographicsService
+from services.data_registry import get_estimator
+from services.sor_registry import get_registry, resolve_catalog
 
 # ---------------------------------------------------------
 # Router
 # ---------------------------------------------------------
 router = APIRouter(prefix="/api", tags=["Process All"])
 
-# ---------------------------------------------------------
-# Services
-# ---------------------------------------------------------
-RULEBOOK_PATH = os.path.join("data", "rulebook.json")
-estimator = EstimationService(RULEBOOK_PATH)
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def _stream_frames(estimator, interventions, catalog_key, fmt):
+    from services.process_pipeline import run_pipeline_stream
+
+    for frame in run_pipeline_stream(estimator, interventions, catalog=catalog_key):
+        if frame["type"] == "summary":
+            frame["catalog"] = str(catalog_key)
+        payload = json.dumps(frame)
+        if fmt == "sse":
+            yield f"event: {frame['type']}\ndata: {payload}\n\n"
+        else:
+            yield payload + "\n"
+
 
 # ---------------------------------------------------------
 # Endpoint
 # ---------------------------------------------------------
 @router.post("/process-all")
-def process_all(interventions: List[Dict[str, Any]]):
+def process_all(
+    interventions: List[Dict[str, Any]],
+    catalog: Optional[str] = None,
+    stream: Optional[str] = None
+):
     """
-    Full pipeline:
-    1. Quantity estimation
-    2. Cost estimation
-    3. Analytics (demographics)
+    Full pipeline (services/process_pipeline.py):
+    1. Classification
+    2. Quantity estimation
+    3. Cost estimation (fanned out over a worker pool)
+    4. Analytics (demographics)
+
+    Interventions that fail are returned inline with "error" and "stage"
+    and are left out of the totals; "failed" counts them.
+
+    Query param `catalog` selects the SOR catalog to price against,
+    e.g. ?catalog=2023/roads or ?catalog=kerala/2024/roads.
+
+    Query param `stream` (opt-in) streams the result instead:
+      ?stream=ndjson  -> application/x-ndjson, one JSON frame per line
+      ?stream=sse     -> text/event-stream, "intervention" / "summary" events
+    Each costed intervention is sent as {"type": "intervention", "index", "data"}
+    as soon as it is ready; the last frame is {"type": "summary", "catalog",
+    "failed", "grand_total", "demographics"}.
 
     Expected input:
     [
@@ -40,47 +71,29 @@ def process_all(interventions: List[Dict[str, Any]]):
     ]
     """
 
-    results = []
-    grand_total = 0.0
-
-    for item in interventions:
-        try:
-            # -----------------------------
-            # Quantity estimation
-            # -----------------------------
-            est = estimator.estimate(
-                intervention=item["intervention"],
-                clause_key=None,  # ⚠️ USE extracted clause, not matcher
-                chainage_m=item.get("chainage_m", {})
-            )
-
-            # -----------------------------
-            # Cost estimation
-            # -----------------------------
-            cost = calculate_costs(est.get("materials", {}),intervention_type=est.get("intervention_type"))
-
-            results.append({
-                "intervention": est.get("intervention"),
-                "chainage": item.get("chainage"),
-                "clause_used": est.get("clause_used"),
-                "cost": cost
-            })
-
-            grand_total += cost["total_cost"]
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to process intervention: {str(e)}"
-            )
-
-    # -----------------------------
-    # Analytics
-    # -----------------------------
-    demographics = DemographicsService.compute(results)
+    try:
+        catalog_key = resolve_catalog(catalog)
+        get_registry().csv_path(catalog_key)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if stream:
+        fmt = stream.lower()
+        if fmt not in STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unsupported stream format: {stream}")
+        return StreamingResponse(
+            _stream_frames(get_estimator(), interventions, catalog_key, fmt),
+            media_type=STREAM_MEDIA_TYPES[fmt]
+        )
+
+    from services.process_pipeline import run_pipeline
+
+    report = run_pipeline(get_estimator(), interventions, catalog=catalog_key)
 
     return {
-        "interventions": results,
-        "grand_total": round(grand_total, 2),
-        "demographics": demographics
+        "interventions": report["interventions"],
+        "catalog": str(catalog_key),
+        "failed": report["failed"],
+        "grand_total": report["grand_total"],
+        "demographics": report["demographics"]
     }
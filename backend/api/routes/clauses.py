@@ -1,18 +1,36 @@
 # backend/api/routes/clauses.py
+from typing import List
+
 from fastapi import APIRouter
+from pydantic import BaseModel
 
-from core.clause_matcher import ClauseMatcher
+from services.data_registry import get_clause_matcher
 
-matcher = ClauseMatcher("data/irc_clauses.json")
 router = APIRouter()
 
 @router.post("/match")
 def match_clause(payload: dict):
     intervention_text = payload["intervention"]
-    key, clause, score = matcher.find_best(intervention_text)
+    key, clause, score = get_clause_matcher().find_best(intervention_text)
 
     return {
         "key": key,
         "similarity": score,
         "clause": clause
     }
+
+
+class ClauseBatchInput(BaseModel):
+    interventions: List[str] = []
+
+
+@router.post("/match-batch")
+def match_clauses(payload: ClauseBatchInput):
+    """
+    payload: {"interventions": ["...", "..."]}
+    Matches every intervention of a report in one call.
+    """
+    return [
+        {"key": key, "similarity": score, "clause": clause}
+        for key, clause, score in get_clause_matcher().find_best_batch(payload.interventions)
+    ]
@@ -14,7 +14,7 @@ Produces:
 
 from fastapi import APIRouter
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from api.controllers.cost_controller import compute_cost_controller
 
@@ -30,6 +30,7 @@ class EstimationInput(BaseModel):
     intervention_type: str
     params_used: Dict[str, Any]
     materials: Dict[str, float]
+    catalog: Optional[str] = None   # SOR catalog selector, e.g. "2023/roads"
 
 
 # ---------------------------------------------------------
@@ -1,22 +1,27 @@
 # backend/api/routes/extract.py
 from fastapi import APIRouter, UploadFile, File
-import os
-from core.extractor import read_pdf, extract_interventions
+from services.upload_store import save_upload, load_cached_extraction, store_extraction, extraction_response
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+
 
 @router.post("/pdf")
 async def extract_from_pdf(file: UploadFile = File(...)):
     print("\n--- Incoming PDF Upload ---")
     print("Filename:", file.filename)
     try:
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
+        # Stream to the content-addressed store (uploads/<sha[:2]>/<sha>.pdf)
+        sha256, file_path = await save_upload(file)
         print("Saved to:", file_path)
 
+        cached = load_cached_extraction(sha256)
+        if cached is not None:
+            print("EXTRACTION CACHE HIT:", sha256)
+            return extraction_response(file.filename, sha256, cached["interventions"], True)
+
+        # PyMuPDF loads with the first extraction
+        from core.extractor import read_pdf, extract_interventions
+
         # Read text
         try:
             text = read_pdf(file_path)
@@ -36,10 +41,8 @@ async def extract_from_pdf(file: UploadFile = File(...)):
             print("INTERVENTION EXTRACT ERROR:", e)
             return {"error": f"Intervention extraction failed: {str(e)}", "step": "extract_interventions"}
 
-        if not interventions:
-            return {"warning": "No interventions detected", "filename": file.filename, "count": 0, "interventions": []}
-
-        return {"filename": file.filename, "count": len(interventions), "interventions": interventions}
+        store_extraction(sha256, {"interventions": interventions})
+        return extraction_response(file.filename, sha256, interventions, False)
 
     except Exception as e:
         print("SERVER ERROR:", e)
@@ -0,0 +1,57 @@
+# backend/api/routes/jobs.py
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import List, Dict, Any, Optional
+
+from services.job_queue import get_job_store, STATUS_DONE, STATUS_FAILED
+from services.sor_registry import get_registry, resolve_catalog
+from services.upload_store import save_upload
+
+router = APIRouter()
+
+
+@router.post("/extract-pdf")
+async def submit_extract_pdf(file: UploadFile = File(...)):
+    """
+    Queues PDF extraction. Returns {"job_id"}; poll GET /jobs/{job_id}
+    for progress (pages_read, total_pages, interventions_found).
+    """
+    sha256, file_path = await save_upload(file)
+    job_id = get_job_store().submit(
+        "extract_pdf", {"file_path": file_path, "filename": file.filename, "sha256": sha256}
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.post("/process-all")
+def submit_process_all(interventions: List[Dict[str, Any]], catalog: Optional[str] = None):
+    """
+    Queues the /api/process-all pipeline. Progress reports processed / total.
+    """
+    try:
+        catalog_key = resolve_catalog(catalog)
+        get_registry().csv_path(catalog_key)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job_id = get_job_store().submit("process_all", {"interventions": interventions, "catalog": str(catalog_key)})
+    return {"job_id": job_id, "status": "queued"}
+
+
+@router.get("/{job_id}")
+def job_status(job_id: str):
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/result")
+def job_result(job_id: str):
+    job = get_job_store().get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == STATUS_FAILED:
+        raise HTTPException(status_code=500, detail=job["error"] or "Job failed")
+    if job["status"] != STATUS_DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return job["result"]
@@ -0,0 +1,91 @@
+# backend/api/routes/scenarios.py
+"""
+Scenario API Routes
+-------------------
+    POST   /scenarios                 process a report once, returns {"session_id"}
+    POST   /scenarios/{id}/sweep      re-cost it under a set / grid of scenarios
+    GET    /scenarios/{id}            session summary
+    DELETE /scenarios/{id}
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from services.data_registry import get_estimator
+
+router = APIRouter()
+
+
+def _engine():
+    # NumPy and the pricing stack load with the first scenario request
+    from services import scenario_engine
+    return scenario_engine
+
+
+class SweepInput(BaseModel):
+    scenarios: Optional[List[Dict[str, Any]]] = None
+    grid: Optional[Dict[str, List[Any]]] = None
+    catalogs: Optional[List[str]] = None
+
+
+@router.post("")
+def create_scenario_session(interventions: List[Dict[str, Any]], catalog: Optional[str] = None):
+    """
+    Classifies and estimates the report (same input as /api/process-all)
+    and keeps it in memory for sweeps. `catalog` is the default SOR
+    catalog of the session's scenarios.
+    """
+    try:
+        session_id, session = _engine().create_session(get_estimator(), interventions, catalog)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"session_id": session_id, **session.summary()}
+
+
+@router.post("/{session_id}/sweep")
+def sweep(session_id: str, payload: SweepInput):
+    """
+    payload:
+    {
+      "scenarios": [{"name": "...", "overrides": {"ROAD_STUDS": {"spacing_m": 6}}, "catalog": "2023/roads"}],
+      "grid": {"ROAD_STUDS.spacing_m": [6, 8, 10], "ROAD_MARKING.width_mm": [150, 200]},
+      "catalogs": ["2023/roads"]
+    }
+    Returns one {"name", "catalog", "overrides", "grand_total", "by_type"}
+    per scenario.
+    """
+    session = _engine().get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Scenario session not found")
+
+    started = time.perf_counter()
+    try:
+        scenarios = session.normalize_scenarios(payload.scenarios, payload.grid, payload.catalogs)
+        if not scenarios:
+            raise ValueError("No scenarios given")
+        results = session.sweep(scenarios)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "session_id": session_id,
+        "scenarios": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+@router.get("/{session_id}")
+def session_summary(session_id: str):
+    session = _engine().get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Scenario session not found")
+    return {"session_id": session_id, **session.summary()}
+
+
+@router.delete("/{session_id}")
+def delete_session(session_id: str):
+    if not _engine().drop_session(session_id):
+        raise HTTPException(status_code=404, detail="Scenario session not found")
+    return {"session_id": session_id, "deleted": True}
@@ -0,0 +1,60 @@
+# backend/core/clause_index.py
+"""
+Precomputed index for clause matching.
+
+Clause texts are lower-cased once and indexed with a character n-gram
+TF-IDF matrix. A query is scored against every clause with one sparse
+product; the top few candidates can then be reranked with the original
+difflib SequenceMatcher ratio, so the reported similarity stays on the
+same scale as before while the O(N * L^2) difflib work only runs on
+RERANK_K clauses per query.
+"""
+from difflib import SequenceMatcher
+from typing import List, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+TOP_K = 5
+RERANK_K = 50
+
+
+class ClauseIndex:
+
+    def __init__(self, texts: List[str]):
+        self.texts_lower = [t.lower() for t in texts]
+        self.size = len(texts)
+        self.vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True)
+        self.matrix = self.vectorizer.fit_transform(self.texts_lower) if self.size else None
+
+    def search_batch(self, queries: List[str], top_k: int = TOP_K, rerank: bool = True,
+                     rerank_k: int = RERANK_K) -> List[List[Tuple[int, float]]]:
+        """
+        Returns [(clause_position, score), ...] best first for each query.
+        With rerank=True the score is the SequenceMatcher ratio, otherwise
+        the TF-IDF cosine.
+        """
+        if not queries:
+            return []
+        if not self.size:
+            return [[] for _ in queries]
+
+        queries_lower = [q.lower() for q in queries]
+        sims = (self.vectorizer.transform(queries_lower) @ self.matrix.T).toarray()
+
+        k = min(max(top_k, rerank_k if rerank else 0), self.size)
+        candidates = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+
+        results = []
+        for q, row, cand in zip(queries_lower, sims, candidates):
+            cand = cand[np.argsort(-row[cand], kind="stable")]
+            if rerank:
+                scored = [(int(i), SequenceMatcher(None, q, self.texts_lower[i]).ratio()) for i in cand]
+                scored.sort(key=lambda x: -x[1])
+            else:
+                scored = [(int(i), float(row[i])) for i in cand]
+            results.append(scored[:top_k])
+        return results
+
+    def search(self, query: str, top_k: int = TOP_K, rerank: bool = True) -> List[Tuple[int, float]]:
+        return self.search_batch([query], top_k=top_k, rerank=rerank)[0]
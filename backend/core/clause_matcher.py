@@ -1,24 +1,44 @@
 import json
-import difflib
-import os
+
+from core.clause_index import ClauseIndex
 
 class ClauseMatcher:
 
     def __init__(self, json_path):
         with open(json_path, "r", encoding="utf-8") as f:
-            self.clauses = json.load(f)
+            self._load(json.load(f))
+
+    @classmethod
+    def from_clauses(cls, clauses):
+        """Builds the matcher from an already-parsed irc_clauses.json."""
+        matcher = cls.__new__(cls)
+        matcher._load(clauses)
+        return matcher
+
+    def _load(self, clauses):
+        self.clauses = clauses
+        self._keys = list(self.clauses.keys())
+        self.index = ClauseIndex([obj.get("text", "") for obj in self.clauses.values()])
+
+    def find_best_batch(self, texts, rerank=True):
+        """
+        Returns [(key, clause, score), ...], one per text.
+        """
+        results = []
+        for hits in self.index.search_batch(list(texts), top_k=1, rerank=rerank):
+            if not hits or hits[0][1] <= 0:
+                results.append((None, None, 0))
+                continue
+            pos, score = hits[0]
+            key = self._keys[pos]
+            results.append((key, self.clauses[key], score))
+        return results
 
     def find_best(self, text):
-        best_key = None
-        best_score = 0
-        best_clause = None
-
-        for key, obj in self.clauses.items():
-            ctext = obj.get("text", "")
-            score = difflib.SequenceMatcher(None, text.lower(), ctext.lower()).ratio()
-            if score > best_score:
-                best_score = score
-                best_key = key
-                best_clause = obj
-
-        return best_key, best_clause, best_score
+        return self.find_best_batch([text])[0]
+
+    def top_k(self, text, k=5, rerank=True):
+        return [
+            (self._keys[pos], self.clauses[self._keys[pos]], score)
+            for pos, score in self.index.search(text, top_k=k, rerank=rerank)
+        ]
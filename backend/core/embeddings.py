@@ -1,38 +1,136 @@
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 import pickle
 import os
+import shutil
+import threading
+import time
 
-MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-INDEX_PATH = "backend/data/faiss_index/sor_index.pkl"
-META_PATH = "backend/data/faiss_index/sor_meta.pkl"
+from core.encoder import ENCODER
+
+INDEX_DIR = "backend/data/faiss_index"
+BUILDS_DIR = os.path.join(INDEX_DIR, "builds")
+# Names the live build under BUILDS_DIR; replaced atomically by build_index
+CURRENT_PATH = os.path.join(INDEX_DIR, "CURRENT")
+INDEX_FILE = "sor_index_faiss.index"
+META_FILE = "sor_meta.pkl"
+# Builds kept on disk, including the live one
+KEEP_BUILDS = 2
 
 def build_index(descriptions, ids):
     # descriptions: list[str], ids: list[int] corresponding to SORItem.id
-    embeddings = MODEL.encode(descriptions, convert_to_numpy=True)
+    embeddings = ENCODER.encode(descriptions)
     dim = embeddings.shape[1]
     index = faiss.IndexFlatIP(dim)
     faiss.normalize_L2(embeddings)
     index.add(embeddings)
-    # save index and metadata
-    os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
-    faiss.write_index(index, INDEX_PATH.replace(".pkl","_faiss.index"))
-    with open(META_PATH, "wb") as f:
+    # save index and metadata into a fresh build directory, then point
+    # CURRENT at it with one rename: readers see the old pair or the new
+    # pair, never one file from each
+    build_id = f"{time.time_ns()}-{os.getpid()}"
+    build_dir = os.path.join(BUILDS_DIR, build_id)
+    os.makedirs(build_dir)
+    faiss.write_index(index, os.path.join(build_dir, INDEX_FILE))
+    with open(os.path.join(build_dir, META_FILE), "wb") as f:
         pickle.dump({"ids": ids, "descriptions": descriptions}, f)
+    tmp = f"{CURRENT_PATH}.{build_id}.tmp"
+    with open(tmp, "w") as f:
+        f.write(build_id)
+    os.replace(tmp, CURRENT_PATH)
+    _prune_builds(build_id)
     return True
 
-def query_index(query, top_k=5):
-    q_emb = MODEL.encode([query], convert_to_numpy=True)
+
+def _prune_builds(current):
+    # Oldest first; the live build is never removed
+    builds = sorted(os.listdir(BUILDS_DIR), key=lambda b: int(b.split("-")[0]))
+    for build_id in builds[:-KEEP_BUILDS]:
+        if build_id != current:
+            shutil.rmtree(os.path.join(BUILDS_DIR, build_id), ignore_errors=True)
+
+
+class IndexHolder:
+    """
+    Process-wide holder for the FAISS index and its metadata.
+
+    Each build_index run writes both files into its own directory under
+    builds/ and then swaps the CURRENT pointer file. The live pair is read
+    once and kept in memory; each get() reads CURRENT and, if it names a
+    new build, loads that build's pair and swaps it in as a single
+    (index, meta) tuple. A build that fails to load or whose sizes disagree
+    is ignored and the previous one keeps serving; it is not retried until
+    CURRENT changes again.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._loaded = None        # (index, meta)
+        self._signature = None     # build id of the loaded pair
+        self._failed_signature = None  # build id of the last pair that failed to load
+
+    def _current(self):
+        try:
+            with open(os.path.join(self.index_dir, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @property
+    def signature(self):
+        """Build id of the loaded (index, meta) pair; changes when a new build is swapped in."""
+        return self._signature
+
+    def get(self):
+        signature = self._current()
+        if signature is not None and signature not in (self._signature, self._failed_signature):
+            with self._lock:
+                if signature not in (self._signature, self._failed_signature):
+                    self._reload(signature)
+        if self._loaded is None:
+            raise FileNotFoundError(f"FAISS index not found in {self.index_dir}")
+        return self._loaded
+
+    def _reload(self, signature):
+        build_dir = os.path.join(self.index_dir, "builds", signature)
+        try:
+            index = faiss.read_index(os.path.join(build_dir, INDEX_FILE))
+            with open(os.path.join(build_dir, META_FILE), "rb") as f:
+                meta = pickle.load(f)
+        except Exception as e:
+            print(f"[WARN] Could not load FAISS index: {e}")
+            self._failed_signature = signature
+            return
+        if index.ntotal != len(meta["ids"]):
+            print(f"[WARN] FAISS index has {index.ntotal} vectors but metadata has {len(meta['ids'])} ids; not loading it")
+            self._failed_signature = signature
+            return
+        self._loaded = (index, meta)
+        self._signature = signature
+
+
+INDEX_HOLDER = IndexHolder()
+
+
+def query_index_batch(queries, top_k=5):
+    """
+    Encodes every query in one model call and searches them in one FAISS call.
+    Returns one result list per query.
+    """
+    if not queries:
+        return []
+    index, meta = INDEX_HOLDER.get()
+    q_emb = ENCODER.encode(queries)
     faiss.normalize_L2(q_emb)
-    index = faiss.read_index(INDEX_PATH.replace(".pkl","_faiss.index"))
     D, I = index.search(q_emb, top_k)
-    # load meta
-    import pickle
-    with open(META_PATH, "rb") as f:
-        meta = pickle.load(f)
-    results = []
-    for idx, score in zip(I[0], D[0]):
-        if idx < 0: continue
-        results.append({"id": meta["ids"][idx], "desc": meta["descriptions"][idx], "score": float(score)})
-    return results
+    batch = []
+    for ids, scores in zip(I, D):
+        results = []
+        for idx, score in zip(ids, scores):
+            if idx < 0: continue
+            results.append({"id": meta["ids"][idx], "desc": meta["descriptions"][idx], "score": float(score)})
+        batch.append(results)
+    return batch
+
+def query_index(query, top_k=5):
+    return query_index_batch([query], top_k=top_k)[0]
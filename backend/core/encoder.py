@@ -0,0 +1,141 @@
+# backend/core/encoder.py
+"""
+Shared sentence-embedding encoder.
+
+The SentenceTransformer model is loaded on the first encode() call, not at
+import. Concurrent encode() calls are queued and a single worker thread
+merges them into micro-batches: it waits at most ENCODER_MAX_WAIT_MS after
+the first queued request, or until ENCODER_MAX_BATCH texts are queued, and
+then runs one model.encode over the whole batch.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+MAX_BATCH_SIZE = int(os.environ.get("ENCODER_MAX_BATCH", 64))
+MAX_WAIT_MS = float(os.environ.get("ENCODER_MAX_WAIT_MS", 5))
+
+
+class EncoderService:
+
+    def __init__(self, model_name=MODEL_NAME, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._batches = 0
+        self._texts = 0
+        self._requests = 0
+        self._max_batch_seen = 0
+
+    # --------------------------------------------------
+    # MODEL
+    # --------------------------------------------------
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    # --------------------------------------------------
+    # ENCODE
+    # --------------------------------------------------
+    def encode(self, texts) -> np.ndarray:
+        """
+        Same result as model.encode(texts, convert_to_numpy=True); the call
+        may share a model invocation with other threads' requests.
+        """
+        texts = list(texts)
+        if not texts:
+            return self.model.encode([], convert_to_numpy=True)
+
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch):
+        texts = [t for req_texts, _ in batch for t in req_texts]
+        try:
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._requests += len(batch)
+        self._texts += len(texts)
+        self._max_batch_seen = max(self._max_batch_seen, len(texts))
+
+        start = 0
+        for req_texts, future in batch:
+            end = start + len(req_texts)
+            future.set_result(embeddings[start:end])
+            start = end
+
+    # --------------------------------------------------
+    # STATS
+    # --------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "model_loaded": self.loaded,
+            "queue_depth": self._queue.qsize(),
+            "batches": self._batches,
+            "requests": self._requests,
+            "texts": self._texts,
+            "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": self._max_batch_seen,
+            "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000.0},
+        }
+
+
+ENCODER = EncoderService()
+
+
+def get_encoder() -> EncoderService:
+    return ENCODER
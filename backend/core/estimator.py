@@ -1,17 +1,15 @@
-from core.rag_retriever import retrieve_sor_items
+from core.rag_retriever import retrieve_sor_items, retrieve_sor_items_batch
 
-def price_material(material_description, quantity, preferred_unit=None):
-    # 1. Retrieve candidate SOR items
-    candidates = retrieve_sor_items(material_description, top_k=6)
-    # 2. Heuristic: prefer same unit
+def choose_candidate(candidates, preferred_unit=None):
+    # Heuristic: prefer same unit
     if preferred_unit:
         same_unit = [c for c in candidates if c["unit"] and preferred_unit.lower() in c["unit"].lower()]
         if same_unit:
-            chosen = same_unit[0]
-        else:
-            chosen = candidates[0] if candidates else None
-    else:
-        chosen = candidates[0] if candidates else None
+            return same_unit[0]
+    return candidates[0] if candidates else None
+
+def build_price(quantity, candidates, preferred_unit=None):
+    chosen = choose_candidate(candidates, preferred_unit)
 
     if not chosen or chosen["unit_rate"] is None:
         return {"quantity": quantity, "selected_item": None, "unit_rate": None, "amount": None, "candidates": candidates}
@@ -25,3 +23,21 @@ def price_material(material_description, quantity, preferred_unit=None):
         "amount": amount,
         "candidates": candidates
     }
+
+def price_material(material_description, quantity, preferred_unit=None):
+    # 1. Retrieve candidate SOR items
+    candidates = retrieve_sor_items(material_description, top_k=6)
+    # 2. Pick one and price it
+    return build_price(quantity, candidates, preferred_unit)
+
+def price_materials(requests):
+    """
+    requests: [(material_description, quantity, preferred_unit), ...]
+    Same result as calling price_material for each, with one retrieval
+    round for the whole list.
+    """
+    candidate_lists = retrieve_sor_items_batch([r[0] for r in requests], top_k=6)
+    return [
+        build_price(quantity, candidates, preferred_unit)
+        for (_, quantity, preferred_unit), candidates in zip(requests, candidate_lists)
+    ]
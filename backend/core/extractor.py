@@ -1,19 +1,87 @@
 # backend/core/extractor.py
 import fitz
+import multiprocessing
+import os
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Bump whenever extraction output changes; keys the upload extraction cache
+EXTRACTOR_VERSION = 1
+
+# Documents with fewer pages than this are read serially (pool overhead dominates)
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 48))
+PDF_READ_WORKERS = int(os.environ.get("PDF_READ_WORKERS", min(8, os.cpu_count() or 1)))
+
+# Pool size -> pool; read_pdf(workers=n) gets a pool of n processes
+_PDF_POOLS = {}
+_PDF_POOL_LOCK = threading.Lock()
 
 
 # ============================================================
 # PDF TEXT
 # ============================================================
 
-def read_pdf(file_path):
+def _get_pdf_pool(workers):
+    pool = _PDF_POOLS.get(workers)
+    if pool is None:
+        with _PDF_POOL_LOCK:
+            pool = _PDF_POOLS.get(workers)
+            if pool is None:
+                # spawn, not fork: the server process is threaded
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                _PDF_POOLS[workers] = pool
+    return pool
+
+
+def _read_page_span(file_path, start, stop):
+    # Runs in a pool worker: each worker opens its own handle on the document
+    doc = fitz.open(file_path)
+    try:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def read_pdf(file_path, page_range=None, workers=None):
+    """
+    Returns the text of the PDF, pages joined by newlines (empty pages skipped).
+
+    page_range: optional (start, stop) page indices, 0-based and stop-exclusive
+                like range(); clipped to the document.
+    workers:    worker processes for large documents (default
+                PDF_READ_WORKERS); 1 forces a serial read.
+                Documents under PDF_PARALLEL_MIN_PAGES pages are read serially.
+    """
     doc = fitz.open(file_path)
+    try:
+        start, stop = 0, doc.page_count
+        if page_range is not None:
+            start = max(0, page_range[0])
+            stop = min(doc.page_count, page_range[1])
+
+        workers = PDF_READ_WORKERS if workers is None else workers
+        n_pages = max(0, stop - start)
+
+        if workers <= 1 or n_pages < PDF_PARALLEL_MIN_PAGES:
+            pages = [doc[i].get_text("text") for i in range(start, stop)]
+            return "\n".join(t for t in pages if t)
+    finally:
+        doc.close()
+
+    # Contiguous spans, a few per worker so uneven pages balance out
+    n_spans = min(n_pages, workers * 4)
+    bounds = [start + (n_pages * k) // n_spans for k in range(n_spans + 1)]
+
+    pool = _get_pdf_pool(workers)
+    futures = [
+        pool.submit(_read_page_span, file_path, bounds[k], bounds[k + 1])
+        for k in range(n_spans)
+    ]
+
     text = []
-    for p in doc:
-        t = p.get_text("text")
-        if t:
-            text.append(t)
+    for fut in futures:
+        text.extend(t for t in fut.result() if t)
     return "\n".join(text)
 
 
@@ -21,139 +89,216 @@ def read_pdf(file_path):
 # PARSE A CHAINAGE STRING LIKE "4+200"
 # ============================================================
 
+_CHAIN_PARTS_RE = re.compile(r"(\d+)\s*\+\s*(\d+)")
+
+
 def chain_to_meters(c):
-    m = re.match(r"(\d+)\s*\+\s*(\d+)", c)
+    m = _CHAIN_PARTS_RE.match(c)
     if not m:
         return None
     return int(m.group(1)) * 1000 + int(m.group(2))
 
 
+# ============================================================
+# STREAMING LINE SOURCE
+# ============================================================
+
+def iter_pdf_lines(file_path, page_range=None, on_page=None):
+    """
+    Yields the raw text lines of the PDF one page at a time, so only a
+    single page is held in memory. on_page(pages_read, total_pages) is
+    called after each page (used for job progress).
+    """
+    doc = fitz.open(file_path)
+    try:
+        start, stop = 0, doc.page_count
+        if page_range is not None:
+            start = max(0, page_range[0])
+            stop = min(doc.page_count, page_range[1])
+
+        for i in range(start, stop):
+            t = doc[i].get_text("text")
+            if t:
+                yield from t.splitlines()
+            if on_page is not None:
+                on_page(i - start + 1, stop - start)
+    finally:
+        doc.close()
+
+
+# ============================================================
+# LEXER
+# ============================================================
+# Every cleaned line is tagged exactly once; the parser below only looks
+# at tags (and the text of body lines).
+
+_HEADER_RE = re.compile(r"Road Safety Intervention Report|CoERS|IIT|Hackathon|Page\s*\d+", re.I)
+
+_CHAINAGE_RE = re.compile(r"\d+\s*\+\s*\d+")
+_ACTION_RE = re.compile(
+    r"\b(shall be|should be|to be|replace|replaced|install|installed|provide|provided|repaint|paint|shall\s+be\s+provided|shall\s+be\s+replaced)\b",
+    re.I,
+)
+_OBSERVATION_RE = re.compile(
+    r"\b(missing|non[-\s]?standard|damaged|faded|absent|broken|not provided|worn out|poor condition)\b",
+    re.I,
+)
+_CLAUSE_START_RE = re.compile(r"clause\s*\d+(\.\d+)*", re.I)
+_YEAR_RE = re.compile(r"\b(19|20)\d{2}\b")
+
+CHAINAGE = "CHAINAGE"
+TO = "TO"
+AMP = "AMP"
+OBSERVATION = "OBSERVATION"
+ACTION = "ACTION"
+OTHER = "OTHER"
+
+
+# Raw lines per header-strip pass in _clean_lines
+_CLEAN_BLOCK_LINES = 64
+
+
+def _clean_lines(raw_lines):
+    """
+    Block-at-a-time form of the header/footer strip + splitlines + strip
+    done on the full text. A block is only cut after a line that cannot
+    be the start of a "Page\\s*\\d+" match spanning the line break (i.e. one
+    not ending in "Page" + whitespace), so results match the whole-text
+    pass while only _CLEAN_BLOCK_LINES lines are held.
+    """
+    pending = []
+    for raw in raw_lines:
+        pending.append(raw)
+        if len(pending) < _CLEAN_BLOCK_LINES:
+            continue
+        # "Page" + whitespace at the end of a line may still be completed by digits on a later line
+        tail = raw.rstrip()
+        if not tail or tail[-4:].lower() == "page":
+            continue
+
+        for ln in _HEADER_RE.sub(" ", "\n".join(pending)).splitlines():
+            ln = ln.strip()
+            if ln:
+                yield ln
+        pending = []
+
+    if pending:
+        for ln in _HEADER_RE.sub(" ", "\n".join(pending)).splitlines():
+            ln = ln.strip()
+            if ln:
+                yield ln
+
+
+def tag_line(ln):
+    # ACTION wins over OBSERVATION when a line has both
+    if _CHAINAGE_RE.fullmatch(ln):
+        return CHAINAGE
+    if ln == "&":
+        return AMP
+    if ln.lower() == "to":
+        return TO
+    if _ACTION_RE.search(ln):
+        return ACTION
+    if _OBSERVATION_RE.search(ln):
+        return OBSERVATION
+    return OTHER
+
+
+def lex(raw_lines):
+    """Yields (tag, line) for each cleaned, non-empty line."""
+    for ln in _clean_lines(raw_lines):
+        yield tag_line(ln), ln
+
+
 # ============================================================
 # EXTRACT INTERVENTIONS (FINAL, CORRECT, COLUMN-AWARE)
 # ============================================================
-def extract_interventions(text):
-    # Remove headers / footers
-    text = re.sub(r"Road Safety Intervention Report|CoERS|IIT|Hackathon|Page\s*\d+", " ", text, flags=re.I)
-
-    lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
-    results = []
-
-    i = 0
-    n = len(lines)
-
-    # Regex patterns from high-accuracy parser
-    action_re = re.compile(
-        r"\b(shall be|should be|to be|replace|replaced|install|installed|provide|provided|repaint|paint|shall\s+be\s+provided|shall\s+be\s+replaced)\b",
-        re.I,
-    )
-    clause_start_re = re.compile(r"clause\s*\d+(\.\d+)*", re.I)
-    observation_re = re.compile(
-        r"\b(missing|non[-\s]?standard|damaged|faded|absent|broken|not provided|worn out|poor condition)\b",
-        re.I,
-    )
-    clause_full_re = re.compile(
-        r"clause\s*\d+(\.\d+)*\s*(and\s*Table\s*\d+(\.\d+)*)*\s*of\s*IRC\s*[:\-\s]*[A-Za-z0-9\.:]+[-\s:]*((19|20)\d{2})",
-        re.I,
-    )
-    year_re = re.compile(r"\b(19|20)\d{2}\b")
-
-    while i < n:
-        ln = lines[i]
-
-        # detect chainage row
-        if re.match(r"^\d+\s*\+\s*\d+$", ln):
-
-            # ------ CHAINAGE EXTRACTION (unchanged) ------
-            start_chain = ln
-            start_m = chain_to_meters(start_chain)
-
-            end_chain = start_chain
-            end_m = start_m
-
-            if i + 1 < n and lines[i+1].lower() == "to":
-                if i + 2 < n and re.match(r"^\d+\s*\+\s*\d+$", lines[i+2]):
-                    end_chain = lines[i+2]
-                    end_m = chain_to_meters(end_chain)
-                    i += 3
-                else:
-                    i += 1
-
-            elif i + 1 < n and lines[i+1] == "&":
-                if i + 2 < n and re.match(r"^\d+\s*\+\s*\d+$", lines[i+2]):
-                    end_chain = lines[i+2]
-                    end_m = chain_to_meters(end_chain)
-                    i += 3
-                else:
-                    i += 1
-
-            else:
-                i += 1
-
-            # build chainage text
-            if start_m == end_m:
-                chainage_text = start_chain
-            else:
-                chainage_text = f"{start_chain} to {end_chain}"
-
-            # ------ NEW: HIGH-ACCURACY OBS + INTERVENTION EXTRACTION ------
-            obs_text = ""
-            inter_text = ""
-            buffer = ""
-            collecting = False
-
-            while i < n:
-                # stop when next chainage comes
-                if re.match(r"^\d+\s*\+\s*\d+$", lines[i]):
-                    break
-
-                ln2 = lines[i].strip()
-
-                # Identify OBSERVATION
-                if observation_re.search(ln2) and not action_re.search(ln2):
-                    obs_text += " " + ln2
-                    i += 1
-                    continue
-
-                # Identify START OF INTERVENTION
-                if action_re.search(ln2):
-                    collecting = True
-                    buffer += " " + ln2
-                    i += 1
-                    continue
-
-                # Continue adding intervention lines
-                if collecting:
-                    buffer += " " + ln2
-                    i += 1
-                    continue
-
-                i += 1
-
-            # Clean intervention text
-            inter_text = re.sub(r"\s+", " ", buffer).strip()
-            obs_text = re.sub(r"\s+", " ", obs_text).strip()
-
-            if not inter_text:
+# Parser states
+_SEEK = 0       # before the first chainage row
+_RANGE = 1      # just read a chainage; a TO / AMP may follow
+_RANGE_END = 2  # read chainage + TO / AMP; a second chainage closes the range
+_BODY = 3       # collecting observation / intervention lines
+
+
+def _build_record(start_chain, end_chain, obs_parts, inter_parts):
+    # str.split() splits on the same whitespace set as \\s+
+    inter_text = " ".join(" ".join(inter_parts).split())
+    if not inter_text:
+        return None
+
+    # Final validation: an action plus a clause reference or a year
+    if not (_ACTION_RE.search(inter_text) and (_CLAUSE_START_RE.search(inter_text) or _YEAR_RE.search(inter_text))):
+        return None
+
+    start_m = chain_to_meters(start_chain)
+    end_m = chain_to_meters(end_chain)
+    return {
+        "observation": " ".join(" ".join(obs_parts).split()),
+        "intervention": inter_text,
+        "chainage": start_chain if start_m == end_m else f"{start_chain} to {end_chain}",
+        "chainage_m": {
+            "start_m": start_m,
+            "end_m": end_m,
+            "length_m": abs(end_m - start_m)
+        }
+    }
+
+
+def iter_interventions(raw_lines):
+    """
+    Streaming intervention extractor. Consumes raw text lines (e.g. from
+    iter_pdf_lines or text.splitlines()) and yields each intervention
+    record as soon as the next chainage row (or the end of input) closes
+    it. Parser state carries across page breaks.
+
+    Chainage row, optionally followed by TO / AMP and a second chainage
+    for a range; then, until the next chainage row, OBSERVATION lines are
+    observation text, an ACTION line starts the intervention text and
+    every later line is appended to it.
+    """
+    state = _SEEK
+    start_chain = end_chain = None
+    obs_parts, inter_parts = [], []
+
+    for tag, ln in lex(raw_lines):
+        if state == _RANGE_END:
+            if tag == CHAINAGE:
+                end_chain = ln
+                state = _BODY
                 continue
+            # No closing chainage: the TO / AMP line was an ordinary body line
+            # (skipped, nothing is being collected yet)
+            state = _BODY
 
-            # Final validation (same as your good code)
-            if not (action_re.search(inter_text) and (clause_start_re.search(inter_text) or year_re.search(inter_text))):
+        elif state == _RANGE:
+            if tag == TO or tag == AMP:
+                state = _RANGE_END
                 continue
+            state = _BODY
+
+        if tag == CHAINAGE:
+            if state != _SEEK:
+                record = _build_record(start_chain, end_chain, obs_parts, inter_parts)
+                if record is not None:
+                    yield record
+            start_chain = end_chain = ln
+            obs_parts, inter_parts = [], []
+            state = _RANGE
 
-            # finalize record
-            results.append({
-                "observation": obs_text,
-                "intervention": inter_text,
-                "chainage": chainage_text,
-                "chainage_m": {
-                    "start_m": start_m,
-                    "end_m": end_m,
-                    "length_m": abs(end_m - start_m)
-                }
-            })
+        elif state == _SEEK:
+            continue
 
-        else:
-            i += 1
+        elif tag == OBSERVATION:
+            obs_parts.append(ln)
 
-    return results
+        elif tag == ACTION or inter_parts:
+            inter_parts.append(ln)
 
+    if state != _SEEK:
+        record = _build_record(start_chain, end_chain, obs_parts, inter_parts)
+        if record is not None:
+            yield record
+
+
+def extract_interventions(text):
+    return list(iter_interventions(text.splitlines()))
@@ -3,13 +3,26 @@ import os
 import csv
 import json
 from typing import List, Dict, Any
+import numpy as np
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
-import pickle
 
 DEFAULT_INDEX_DIR = "data/sor_index"
 DEFAULT_CSV_DIR = "data/sor_csv"
 
+# On-disk layout (no pickles; everything loads with allow_pickle=False):
+#   items.json   list of {"description", "unit", "rate", "source"}
+#   vocab.json   vectorizer terms, in column order
+#   idf.npy      float64 idf weight per term
+#   tfidf.npz    scipy.sparse CSR matrix (rows = items)
+ITEMS_FILE = "items.json"
+VOCAB_FILE = "vocab.json"
+IDF_FILE = "idf.npy"
+TFIDF_FILE = "tfidf.npz"
+
+VECTORIZER_PARAMS = {"stop_words": "english"}
+
+
 class PriceIndex:
     def __init__(self, items: List[Dict[str,Any]], vectorizer=None, tfidf_matrix=None, index_dir=DEFAULT_INDEX_DIR):
         self.items = items
@@ -41,50 +54,70 @@ def build_index_from_csv(csv_paths: List[str], index_dir: str = DEFAULT_INDEX_DI
             item = {"description": desc, "unit": unit, "rate": rate, "source": p}
             all_items.append(item)
             texts.append(desc)
-    vectorizer = TfidfVectorizer(stop_words="english", max_features=20000)
+    vectorizer = TfidfVectorizer(max_features=20000, **VECTORIZER_PARAMS)
     if texts:
-        tfidf = vectorizer.fit_transform(texts)
+        tfidf = vectorizer.fit_transform(texts).tocsr()
     else:
         tfidf = None
     idx = PriceIndex(all_items, vectorizer=vectorizer, tfidf_matrix=tfidf, index_dir=index_dir)
-    os.makedirs(index_dir, exist_ok=True)
-    with open(os.path.join(index_dir, "items.pkl"), "wb") as f:
-        pickle.dump(all_items, f)
-    with open(os.path.join(index_dir, "vec.pkl"), "wb") as f:
-        pickle.dump(vectorizer, f)
-    if tfidf is not None:
-        with open(os.path.join(index_dir, "tfidf.npz"), "wb") as f:
-            pickle.dump(tfidf, f)
+    save_index(idx)
     return idx
 
+def save_index(idx: PriceIndex):
+    os.makedirs(idx.index_dir, exist_ok=True)
+    with open(os.path.join(idx.index_dir, ITEMS_FILE), "w", encoding="utf-8") as f:
+        json.dump(idx.items, f)
+    if idx.tfidf_matrix is None:
+        return
+    terms = [None] * len(idx.vectorizer.vocabulary_)
+    for term, col in idx.vectorizer.vocabulary_.items():
+        terms[col] = term
+    with open(os.path.join(idx.index_dir, VOCAB_FILE), "w", encoding="utf-8") as f:
+        json.dump(terms, f)
+    with open(os.path.join(idx.index_dir, IDF_FILE), "wb") as f:
+        np.save(f, np.asarray(idx.vectorizer.idf_, dtype=np.float64))
+    sparse.save_npz(os.path.join(idx.index_dir, TFIDF_FILE), sparse.csr_matrix(idx.tfidf_matrix))
+
 def load_index(index_dir: str = DEFAULT_INDEX_DIR) -> PriceIndex:
-    import pickle
-    items_path = os.path.join(index_dir, "items.pkl")
-    vec_path = os.path.join(index_dir, "vec.pkl")
-    tfidf_path = os.path.join(index_dir, "tfidf.npz")
+    items_path = os.path.join(index_dir, ITEMS_FILE)
     if not os.path.exists(items_path):
         return PriceIndex([], None, None, index_dir=index_dir)
-    with open(items_path, "rb") as f:
-        items = pickle.load(f)
-    with open(vec_path, "rb") as f:
-        vectorizer = pickle.load(f)
+    with open(items_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    vectorizer, tfidf = None, None
     try:
-        with open(tfidf_path, "rb") as f:
-            tfidf = pickle.load(f)
-    except Exception:
-        tfidf = None
+        with open(os.path.join(index_dir, VOCAB_FILE), "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        idf = np.load(os.path.join(index_dir, IDF_FILE), allow_pickle=False)
+        tfidf = sparse.load_npz(os.path.join(index_dir, TFIDF_FILE)).tocsr()
+        vectorizer = TfidfVectorizer(vocabulary={t: i for i, t in enumerate(terms)}, **VECTORIZER_PARAMS)
+        vectorizer.idf_ = idf
+    except (OSError, ValueError):
+        vectorizer, tfidf = None, None
     idx = PriceIndex(items, vectorizer=vectorizer, tfidf_matrix=tfidf, index_dir=index_dir)
     return idx
 
-def lookup_price(idx: PriceIndex, query: str, top_k: int = 5) -> List[Dict[str,Any]]:
+def lookup_price_batch(idx: PriceIndex, queries: List[str], top_k: int = 5) -> List[List[Dict[str,Any]]]:
+    """
+    Top-k items for every query: one transform, one sparse product,
+    and an argpartition per row instead of a full sort.
+    """
     if not idx or not idx.vectorizer or idx.tfidf_matrix is None or not idx.items:
+        return [[] for _ in queries]
+    if not queries:
         return []
-    qvec = idx.vectorizer.transform([query])
-    sims = linear_kernel(qvec, idx.tfidf_matrix).flatten()
-    top_idx = sims.argsort()[::-1][:top_k]
+    qvecs = idx.vectorizer.transform(queries)
+    # rows of both matrices are L2-normalized, so the dot product is the cosine
+    sims = (qvecs @ idx.tfidf_matrix.T).toarray()
+    k = min(top_k, sims.shape[1])
+    if k <= 0:
+        return [[] for _ in queries]
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
     results = []
-    for i in top_idx:
-        r = idx.items[i].copy()
-        r["score"] = float(sims[i])
-        results.append(r)
+    for row, cand in zip(sims, top):
+        order = cand[np.argsort(-row[cand], kind="stable")]
+        results.append([dict(idx.items[i], score=float(row[i])) for i in order])
     return results
+
+def lookup_price(idx: PriceIndex, query: str, top_k: int = 5) -> List[Dict[str,Any]]:
+    return lookup_price_batch(idx, [query], top_k=top_k)[0]
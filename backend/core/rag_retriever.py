@@ -1,23 +1,107 @@
-from core.embeddings import query_index
-from core.db import Session, SORItem
+import os
+import threading
+from collections import OrderedDict
+
+from core.embeddings import query_index_batch, INDEX_HOLDER
+from core.db import Session, SORItem, engine
+
+# SQLite allows 999 bound parameters per statement by default
+FETCH_CHUNK = 500
+ROW_CACHE_SIZE = 4096
+
+_row_cache = OrderedDict()      # SORItem.id -> row dict
+_row_cache_signature = None     # index files + database file the cached rows came from
+_row_cache_lock = threading.Lock()
+
+
+def _row_to_dict(item):
+    return {
+        "sor_item_id": item.id,
+        "item_code": item.item_code,
+        "description": item.description,
+        "unit": item.unit,
+        "unit_rate": item.unit_rate,
+    }
+
+
+def _db_signature():
+    # File stats of a SQLite database (and its WAL); None for other backends
+    path = engine.url.database if engine.url.get_backend_name() == "sqlite" else None
+    if not path:
+        return None
+    stats = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            stats.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stats.append(None)
+    return tuple(stats)
+
+
+def fetch_sor_rows(ids):
+    """
+    Returns {id: row dict} for the given SORItem ids, using one IN (...)
+    query per chunk of ids that are not already cached.
+    """
+    global _row_cache_signature
+
+    rows = {}
+    signature = (INDEX_HOLDER.signature, _db_signature())
+    with _row_cache_lock:
+        # A rebuilt index may point at re-numbered rows, and rows may have
+        # been edited in the database: start over
+        if _row_cache_signature != signature:
+            _row_cache.clear()
+            _row_cache_signature = signature
+        for i in ids:
+            if i in _row_cache:
+                _row_cache.move_to_end(i)
+                rows[i] = _row_cache[i]
+
+    missing = list(dict.fromkeys(i for i in ids if i not in rows))
+    if not missing:
+        return rows
 
-def retrieve_sor_items(material_text, top_k=5):
-    candidates = query_index(material_text, top_k=top_k)
-    # fetch DB rows for candidate ids
     session = Session()
-    results = []
-    for c in candidates:
-        item = session.query(SORItem).filter(SORItem.id==c["id"]).first()
-        if item:
-            results.append({
-                "sor_item_id": item.id,
-                "item_code": item.item_code,
-                "description": item.description,
-                "unit": item.unit,
-                "unit_rate": item.unit_rate,
-                "score": c["score"]
-            })
-    session.close()
-    # optionally post-rank using lexical match or heuristics (prefer same unit)
-    results = sorted(results, key=lambda x: (x["unit_rate"] is not None, x["score"]), reverse=True)
-    return results
+    try:
+        for start in range(0, len(missing), FETCH_CHUNK):
+            chunk = missing[start:start + FETCH_CHUNK]
+            for item in session.query(SORItem).filter(SORItem.id.in_(chunk)):
+                rows[item.id] = _row_to_dict(item)
+    finally:
+        session.close()
+
+    with _row_cache_lock:
+        for i in missing:
+            if i in rows:
+                _row_cache[i] = rows[i]
+        while len(_row_cache) > ROW_CACHE_SIZE:
+            _row_cache.popitem(last=False)
+
+    return rows
+
+
+def retrieve_sor_items_batch(material_texts, top_k=5):
+    """
+    Batch version of retrieve_sor_items: one embedding/FAISS call for all
+    texts and one bulk row fetch for all candidates. Returns one list per text.
+    """
+    candidate_lists = query_index_batch(list(material_texts), top_k=top_k)
+    rows = fetch_sor_rows([c["id"] for candidates in candidate_lists for c in candidates])
+
+    batch = []
+    for candidates in candidate_lists:
+        results = []
+        for c in candidates:
+            row = rows.get(c["id"])
+            if row:
+                results.append(dict(row, score=c["score"]))
+        # optionally post-rank using lexical match or heuristics (prefer same unit)
+        results = sorted(results, key=lambda x: (x["unit_rate"] is not None, x["score"]), reverse=True)
+        batch.append(results)
+    return batch
+
+
+def retrieve_sor_items(material_text, top_k=5):
+    return retrieve_sor_items_batch([material_text], top_k=top_k)[0]
@@ -1,7 +1,11 @@
 # backend/main.py
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from api.routes.extract import router as extract_router
 from api.routes.estimate import router as estimate_router
@@ -9,9 +13,28 @@ from api.routes.clauses import router as clause_router
 from api.routes.cost import router as cost_router
 from api.chatbot import router as chatbot_router
 from api.process_all import router as process_router
+from api.routes.jobs import router as jobs_router
+from api.routes.scenarios import router as scenarios_router
+from services.job_queue import get_worker_pool
+from services import startup_registry
+
+
+# --------------------------------------------------
+# STARTUP / SHUTDOWN
+# --------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background job workers, then the WARMUP_ON_STARTUP preload
+    # (see services/startup_registry.py for /ready and /warmup)
+    get_worker_pool().start()
+    startup_registry.warmup_on_startup()
+    try:
+        yield
+    finally:
+        get_worker_pool().stop()
 
 
-app = FastAPI(title="Road Safety Estimation Backend")
+app = FastAPI(title="Road Safety Estimation Backend", lifespan=lifespan)
 
 # --------------------------------------------------
 # CORS
@@ -31,6 +54,8 @@ app.add_middleware(
 # --------------------------------------------------
 # ROUTES
 # --------------------------------------------------
+# Routers import their heavy dependencies on first use; see
+# services/startup_registry.py for /ready and /warmup.
 
 # 🔥 process-all already has /api prefix inside the file
 app.include_router(process_router)
@@ -39,6 +64,35 @@ app.include_router(extract_router, prefix="/extract", tags=["Extract"])
 app.include_router(clause_router, prefix="/clauses", tags=["Clauses"])
 app.include_router(estimate_router, prefix="/estimate", tags=["Estimate"])
 app.include_router(cost_router, prefix="/cost", tags=["Cost"])
+app.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
+app.include_router(scenarios_router, prefix="/scenarios", tags=["Scenarios"])
+
+
+# --------------------------------------------------
+# READINESS / WARMUP
+# --------------------------------------------------
+@app.get("/ready")
+def ready():
+    """
+    200 when the subsystems in READY_REQUIRES are warm, else 503;
+    the body lists every subsystem's status either way.
+    """
+    report = startup_registry.readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.post("/warmup")
+def warmup(subsystems: Optional[str] = None, wait: bool = True):
+    """
+    Preloads subsystems in parallel threads, e.g.
+    /warmup?subsystems=rulebook,sor,clauses (default: all).
+    wait=false returns at once; poll /ready.
+    """
+    names = [s.strip() for s in subsystems.split(",") if s.strip()] if subsystems else None
+    try:
+        return {"subsystems": startup_registry.warmup(names, wait=wait)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/")
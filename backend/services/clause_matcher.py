@@ -1,6 +1,7 @@
 import json
 import re
-from difflib import SequenceMatcher
+
+from core.clause_index import ClauseIndex
 
 class ClauseMatcher:
     def __init__(self, json_path):
@@ -25,20 +26,24 @@ class ClauseMatcher:
                 "default_quantity": info.get("default_quantity", None),
             })
 
+        self.index = ClauseIndex([c["text"] for c in self.clauses])
+
+    def find_best_clause_batch(self, intervention_texts):
+        """
+        Returns [(clause_key, clause_data, similarity_score), ...], one per text.
+        """
+        results = []
+        for hits in self.index.search_batch(list(intervention_texts), top_k=1):
+            if not hits or hits[0][1] <= 0:
+                results.append((None, {"text": "", "clause_key": None}, 0.0))
+                continue
+            pos, score = hits[0]
+            best_clause = self.clauses[pos]
+            results.append((best_clause["clause_key"], best_clause, score))
+        return results
+
     def find_best_clause(self, intervention_text):
         """
         Returns: (clause_key, clause_data, similarity_score)
         """
-        best_score = 0
-        best_clause = None
-
-        for c in self.clauses:
-            score = SequenceMatcher(None, intervention_text.lower(), c["text"].lower()).ratio()
-            if score > best_score:
-                best_score = score
-                best_clause = c
-
-        if best_clause is None:
-            return None, {"text": "", "clause_key": None}, 0.0
-
-        return best_clause["clause_key"], best_clause, best_score
+        return self.find_best_clause_batch([intervention_text])[0]
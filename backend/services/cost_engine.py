@@ -1,28 +1,53 @@
-from typing import Dict, Any
-from services.price_service import find_best_sor_match
-import json
-import os
-
-INSTALLATION_JSON = os.path.join("data", "installation_costs.json")
+from typing import Dict, Any, Iterable, Optional, Tuple
+from services.price_service import find_best_sor_matches
+from services.sor_registry import CatalogSelector
+from services.data_registry import get_installation_costs
 
 
 # --------------------------------------------------
 # LOAD INSTALLATION COSTS
 # --------------------------------------------------
 def load_installation_costs() -> Dict[str, Any]:
-    if not os.path.exists(INSTALLATION_JSON):
-        return {}
-    with open(INSTALLATION_JSON, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """
+    data/installation_costs.json, loaded once and reloaded when the file
+    changes (services/data_registry.py). Shared: do not modify.
+    """
+    return get_installation_costs()
+
+
+# --------------------------------------------------
+# MATERIAL PRICING
+# --------------------------------------------------
+def material_unit(material: str) -> Optional[str]:
+    return material.split("_")[-1] if "_" in material else None
+
+
+def price_materials(
+    material_keys: Iterable[Tuple[str, Optional[str]]],
+    catalog: CatalogSelector = None
+) -> Dict[Tuple[str, Optional[str]], Optional[Dict[str, Any]]]:
+    """
+    Prices each distinct (material, unit) once.
+    Returns {(material, unit): best_match or None}.
+    """
+    keys = list(dict.fromkeys(material_keys))
+    matches = find_best_sor_matches([(m, 1.0, u) for m, u in keys], catalog=catalog)
+    return {key: price.get("best_match") for key, price in zip(keys, matches)}
 
 
 # --------------------------------------------------
 # COST CALCULATION
 # --------------------------------------------------
-def calculate_costs(
+def build_cost_breakdown(
     materials: Dict[str, float],
-    intervention_type: str | None = None
+    intervention_type: str | None,
+    best_matches: Dict[Tuple[str, Optional[str]], Optional[Dict[str, Any]]],
+    installation_map: Dict[str, Any] | None = None
 ) -> Dict[str, Any]:
+    """
+    Builds the cost items for one intervention from already-priced
+    materials (see price_materials).
+    """
 
     items = []
     total = 0.0
@@ -31,17 +56,17 @@ def calculate_costs(
     # 1. MATERIAL COSTS
     # ----------------------------------
     for material, qty in materials.items():
-        unit = material.split("_")[-1] if "_" in material else None
+        unit = material_unit(material)
+        best = best_matches.get((material, unit)) or {}
 
-        price = find_best_sor_match(material, qty, unit)
-        amount = price.get("estimated_cost") or 0.0
-        best = price.get("best_match") or {}
+        rate = best.get("rate")
+        amount = (rate * qty if rate else None) or 0.0
 
         items.append({
             "material": material,
             "qty": qty,
             "unit": unit,
-            "rate": best.get("rate"),
+            "rate": rate,
             "amount": round(amount, 2),
             "type": "material"
         })
@@ -51,7 +76,8 @@ def calculate_costs(
     # ----------------------------------
     # 2. INSTALLATION COST (DIRECT LOOKUP)
     # ----------------------------------
-    installation_map = load_installation_costs()
+    if installation_map is None:
+        installation_map = load_installation_costs()
 
     inst_rate = 0.0
     inst_unit = "job"
@@ -83,3 +109,16 @@ def calculate_costs(
         "items": items,
         "total_cost": round(total, 2)
     }
+
+
+def calculate_costs(
+    materials: Dict[str, float],
+    intervention_type: str | None = None,
+    catalog: CatalogSelector = None
+) -> Dict[str, Any]:
+    """
+    catalog: SOR catalog selector ("2023/roads", "kerala/2024/roads", ...);
+             None prices against the default catalog.
+    """
+    best_matches = price_materials(((m, material_unit(m)) for m in materials), catalog=catalog)
+    return build_cost_breakdown(materials, intervention_type, best_matches)
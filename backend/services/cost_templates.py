@@ -0,0 +1,220 @@
+# backend/services/cost_templates.py
+"""
+Cost Templates
+--------------
+Fast path for intervention types whose quantities are linear in one
+driving quantity (a sign's count, a marking's length_m, the stud count
+int(max(1, round(length_m / spacing_m))), ...).
+
+Each compiled rulebook formula is decomposed symbolically into
+
+    driver atom  ->  chain of (op, constant) steps
+
+e.g. "length_m * (width_mm/1000.0) * 0.25" becomes atom length_m with
+steps (* 0.15), (* 0.25). The steps replay the formula's own operations
+in its own order, so quantities are bit-identical to evaluating it. A
+type gets a template when every formula shares the same atom (or is
+constant); STREET_LIGHT, which mixes the light count with length_m, and
+anything with a non-constant factor fall back to the full path.
+
+A template is built once per (type, SOR catalog, installation costs
+version, values of the non-driver params) and holds the priced SOR rates and installation row,
+so costing an intervention of that type is: evaluate the atom, replay
+the steps, fill the breakdown; no SOR matching, no JSON reload. Costs
+still go through build_cost_breakdown, per item: quantities are rounded
+to 4 places and item costs to 2 before summing, and a single
+cost-per-driver multiply-add would drift from those totals.
+"""
+
+import ast
+import operator
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from services.cost_engine import build_cost_breakdown, material_unit, price_materials
+from services.data_registry import get_dataset
+from services.rule_formulas import EVAL_GLOBALS, CompiledRule
+from services.sor_registry import CatalogSelector, resolve_catalog
+
+# Params that vary per intervention (derived from chainage or counts);
+# everything else a formula reads is fixed per template.
+DRIVER_PARAMS = frozenset({"count", "length_m", "area_m2"})
+
+_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_TEMPLATES: Dict[Tuple, Optional["CostTemplate"]] = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+class LinearForm(NamedTuple):
+    atom: Optional[ast.expr]        # None: the formula is a constant
+    # (op, constant, atom_on_left) replayed on the atom's value
+    steps: Tuple[Tuple[Any, Any, bool], ...]
+    constant: Any = None            # value when atom is None
+
+
+def _names(node: ast.AST) -> set:
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def _eval_node(node: ast.expr, env: Dict[str, Any]) -> Any:
+    code = compile(ast.Expression(body=node), "<cost_template>", "eval")
+    return eval(code, EVAL_GLOBALS, env)
+
+
+def linearize(node: ast.expr, fixed: Dict[str, Any]) -> Optional[LinearForm]:
+    """
+    Decomposes an expression into atom + constant steps. Sub-expressions
+    that read no driver param are folded to constants with the fixed
+    param values. Returns None when two different driver sub-expressions
+    are combined (not linear in a single driver).
+    """
+    if not (_names(node) & DRIVER_PARAMS):
+        return LinearForm(None, (), _eval_node(node, fixed))
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+        left_driven = bool(_names(node.left) & DRIVER_PARAMS)
+        right_driven = bool(_names(node.right) & DRIVER_PARAMS)
+
+        if left_driven and not right_driven:
+            inner = linearize(node.left, fixed)
+            if inner is None:
+                return None
+            return inner._replace(steps=inner.steps + ((_OPS[type(node.op)], _eval_node(node.right, fixed), True),))
+
+        # const / driver is not linear
+        if right_driven and not left_driven and not isinstance(node.op, ast.Div):
+            inner = linearize(node.right, fixed)
+            if inner is None:
+                return None
+            return inner._replace(steps=inner.steps + ((_OPS[type(node.op)], _eval_node(node.left, fixed), False),))
+
+        return None
+
+    # Any other driven node (a param, int(max(1, round(...))), ...) is the atom
+    return LinearForm(node, ())
+
+
+def _replay(value: Any, steps) -> Any:
+    for op, const, atom_on_left in steps:
+        value = op(value, const) if atom_on_left else op(const, value)
+    return value
+
+
+class CostTemplate:
+
+    def __init__(self, intervention_type: str, atom: Optional[ast.expr],
+                 materials: List[Tuple[str, LinearForm]],
+                 best_matches: Dict[Tuple[str, Optional[str]], Any],
+                 installation_map: Dict[str, Any]):
+        self.intervention_type = intervention_type
+        self.materials = materials
+        self.best_matches = best_matches
+        self.installation_map = installation_map
+
+        self._atom_names = frozenset(_names(atom) - EVAL_GLOBALS.keys()) if atom is not None else frozenset()
+        self._atom_code = compile(ast.Expression(body=atom), "<cost_template>", "eval") if atom is not None else None
+
+    @staticmethod
+    def _quantity(form: LinearForm, driver: Any) -> float:
+        value = form.constant if form.atom is None else _replay(driver, form.steps)
+        return round(float(value), 4)
+
+    def driver(self, params: Dict[str, Any]) -> Any:
+        if self._atom_code is None:
+            return 0
+        return eval(self._atom_code, EVAL_GLOBALS, params)
+
+    def estimate_materials(self, params: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Same quantities as QuantityEstimator.estimate, or None to use the full path."""
+        if not self._atom_names <= params.keys():
+            return None
+        try:
+            d = self.driver(params)
+            return {code: self._quantity(form, d) for code, form in self.materials}
+        except Exception:
+            return None
+
+    def breakdown(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Same result as build_cost_breakdown on the full path, or None."""
+        materials = self.estimate_materials(params)
+        if materials is None:
+            return None
+        return build_cost_breakdown(materials, self.intervention_type, self.best_matches, self.installation_map)
+
+
+def build_template(rule: CompiledRule, params: Dict[str, Any],
+                   catalog: CatalogSelector = None,
+                   installation_map: Optional[Dict[str, Any]] = None) -> Optional[CostTemplate]:
+    """
+    Template for one rule and the fixed (non-driver) param values in
+    params, or None if the rule is not linear in a single driver.
+    """
+    fixed = {k: v for k, v in params.items() if k not in DRIVER_PARAMS}
+    atom = None
+    atom_key = None
+    materials = []
+
+    for code, formula in rule.materials:
+        if formula is None or not formula.names <= params.keys():
+            return None
+        try:
+            form = linearize(formula.tree.body, fixed)
+        except Exception:
+            return None
+        if form is None:
+            return None
+
+        if form.atom is not None:
+            key = ast.dump(form.atom)
+            if atom_key is not None and key != atom_key:
+                return None
+            atom, atom_key = form.atom, key
+        materials.append((code, form))
+
+    keys = [(code, material_unit(code)) for code, _ in materials]
+    best_matches = price_materials(keys, catalog=catalog)
+    if installation_map is None:
+        installation_map = get_dataset("installation_costs").value
+    return CostTemplate(rule.intervention_type, atom, materials, best_matches, installation_map)
+
+
+def get_template(rule: CompiledRule, params: Dict[str, Any],
+                 catalog: CatalogSelector = None) -> Optional[CostTemplate]:
+    """
+    Cached build_template. Keyed by rule, catalog, installation costs
+    version and the values of the non-driver params the formulas read;
+    non-linear rules are cached as None.
+    """
+    installation = get_dataset("installation_costs")
+    names = set()
+    for _, formula in rule.materials:
+        if formula is not None:
+            names |= formula.names
+    try:
+        fixed = tuple(sorted((n, params[n]) for n in names - DRIVER_PARAMS if n in params))
+        formulas = tuple((code, f.source if f is not None else None) for code, f in rule.materials)
+        key = (rule.intervention_type, formulas, str(resolve_catalog(catalog)), installation.version, fixed)
+        hash(key)
+    except (TypeError, ValueError):
+        return None
+
+    with _TEMPLATES_LOCK:
+        if key in _TEMPLATES:
+            return _TEMPLATES[key]
+
+    template = build_template(rule, params, catalog, installation.value)
+
+    with _TEMPLATES_LOCK:
+        _TEMPLATES[key] = template
+    return template
+
+
+def clear_templates():
+    with _TEMPLATES_LOCK:
+        _TEMPLATES.clear()
@@ -0,0 +1,214 @@
+# backend/services/data_registry.py
+"""
+Data Registry
+-------------
+One place that loads the reference data files and shares them across
+routers, job workers and the pipeline:
+
+    rulebook            data/rulebook.json            -> EstimationService
+    installation_costs  data/installation_costs.json  -> dict
+    irc_clauses         data/irc_clauses.json         -> ClauseMatcher
+
+A dataset is loaded on first use. Later lookups stat the file at most
+every DATA_RELOAD_SECONDS (default 1.0; DATA_WATCH=0 disables watching)
+and, when its mtime or size changed, reload it on that call: the new
+object is built completely and then swapped in, so a request sees
+either the old dataset or the new one, never a mix. A file that fails
+to parse (e.g. caught mid-edit) keeps the previous version and logs a
+warning.
+
+Each Dataset carries a version stamp, the SHA-256 of the file it was
+built from (the same hash the SOR match tables record), for use in
+cache keys. Callers should fetch a dataset once per request and use that
+snapshot throughout.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+__all__ = [
+    "Dataset", "DataRegistry", "get_data_registry", "get_dataset",
+    "get_estimator", "get_installation_costs", "get_clause_matcher", "data_versions",
+]
+
+logger = logging.getLogger("services.data_registry")
+
+RULEBOOK_PATH = os.path.join("data", "rulebook.json")
+INSTALLATION_JSON = os.path.join("data", "installation_costs.json")
+IRC_CLAUSES_PATH = os.path.join("data", "irc_clauses.json")
+
+RELOAD_SECONDS = float(os.environ.get("DATA_RELOAD_SECONDS", 1.0))
+WATCH = os.environ.get("DATA_WATCH", "1") != "0"
+
+MISSING_VERSION = "missing"
+
+
+class Dataset(NamedTuple):
+    name: str
+    path: str
+    value: Any
+    version: str        # SHA-256 of the file, or "missing"
+    mtime_ns: int
+    size: int
+    loaded_at: float
+
+
+class _Entry:
+
+    def __init__(self, path: str, build: Callable[[Any, str], Any], missing: Optional[Callable[[], Any]]):
+        self.path = path
+        self.build = build
+        self.missing = missing
+        self.dataset: Optional[Dataset] = None
+        self.checked_at = 0.0
+        self.failed_stat = None     # (mtime_ns, size) of a version that failed to load
+        self.lock = threading.Lock()
+
+
+class DataRegistry:
+
+    def __init__(self, reload_seconds: float = RELOAD_SECONDS, watch: bool = WATCH):
+        self.reload_seconds = reload_seconds
+        self.watch = watch
+        self._entries: Dict[str, _Entry] = {}
+
+    def register(self, name: str, path: str, build: Callable[[Any, str], Any],
+                 missing: Optional[Callable[[], Any]] = None):
+        """
+        build(parsed_json, version) -> value. missing() -> value when the
+        file does not exist; without it a missing file raises
+        FileNotFoundError on get().
+        """
+        self._entries[name] = _Entry(path, build, missing)
+
+    def get(self, name: str) -> Dataset:
+        entry = self._entries[name]
+        dataset = entry.dataset
+
+        if dataset is not None:
+            if not self.watch or time.monotonic() - entry.checked_at < self.reload_seconds:
+                return dataset
+
+        with entry.lock:
+            # Another thread may have (re)loaded it while we waited
+            if entry.dataset is not dataset and entry.dataset is not None:
+                return entry.dataset
+            entry.checked_at = time.monotonic()
+            entry.dataset = self._refresh(name, entry)
+            return entry.dataset
+
+    def _refresh(self, name: str, entry: _Entry) -> Dataset:
+        current = entry.dataset
+
+        try:
+            st = os.stat(entry.path)
+        except FileNotFoundError:
+            if current is not None and current.version == MISSING_VERSION:
+                return current
+            if entry.missing is None:
+                if current is not None:
+                    logger.warning(f"{entry.path} disappeared; keeping version {current.version[:12]}")
+                    return current
+                raise
+            return Dataset(name, entry.path, entry.missing(), MISSING_VERSION, 0, 0, time.time())
+
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if current is not None and stat_key in ((current.mtime_ns, current.size), entry.failed_stat):
+            return current
+
+        with open(entry.path, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha256(raw).hexdigest()
+
+        if current is not None and current.version == version:
+            # Touched but not changed
+            return current._replace(mtime_ns=st.st_mtime_ns, size=st.st_size)
+
+        try:
+            value = entry.build(json.loads(raw.decode("utf-8")), version)
+        except Exception as e:
+            if current is None:
+                raise
+            logger.warning(f"Reloading {entry.path} failed ({e}); keeping version {current.version[:12]}")
+            entry.failed_stat = stat_key
+            return current
+
+        if current is not None:
+            logger.info(f"Reloaded {entry.path}: {current.version[:12]} -> {version[:12]}")
+        return Dataset(name, entry.path, value, version, st.st_mtime_ns, st.st_size, time.time())
+
+    def versions(self, loaded_only: bool = True) -> Dict[str, Optional[str]]:
+        return {
+            name: (entry.dataset.version if entry.dataset is not None else None)
+            for name, entry in self._entries.items()
+            if entry.dataset is not None or not loaded_only
+        }
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].dataset is not None
+
+    def names(self):
+        return list(self._entries)
+
+
+# ---------------------------------------------------------
+# BUILDERS
+# ---------------------------------------------------------
+def _build_estimator(rulebook: Dict[str, Any], version: str):
+    from services.estimation_service import EstimationService
+    return EstimationService.from_rulebook(rulebook, version=version)
+
+
+def _build_clause_matcher(clauses: Dict[str, Any], version: str):
+    from core.clause_matcher import ClauseMatcher
+    return ClauseMatcher.from_clauses(clauses)
+
+
+def _build_dict(data: Dict[str, Any], version: str) -> Dict[str, Any]:
+    return data
+
+
+_REGISTRY: Optional[DataRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_data_registry() -> DataRegistry:
+    global _REGISTRY
+
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                registry = DataRegistry()
+                registry.register("rulebook", RULEBOOK_PATH, _build_estimator)
+                registry.register("installation_costs", INSTALLATION_JSON, _build_dict, missing=dict)
+                registry.register("irc_clauses", IRC_CLAUSES_PATH, _build_clause_matcher)
+                _REGISTRY = registry
+
+    return _REGISTRY
+
+
+def get_dataset(name: str) -> Dataset:
+    return get_data_registry().get(name)
+
+
+def get_estimator():
+    """The shared EstimationService for the current rulebook."""
+    return get_dataset("rulebook").value
+
+
+def get_installation_costs() -> Dict[str, Any]:
+    return get_dataset("installation_costs").value
+
+
+def get_clause_matcher():
+    return get_dataset("irc_clauses").value
+
+
+def data_versions() -> Dict[str, Optional[str]]:
+    """Version stamps of the datasets loaded so far."""
+    return get_data_registry().versions()
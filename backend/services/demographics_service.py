@@ -2,40 +2,59 @@
 
 from collections import defaultdict
 
-class DemographicsService:
 
-    @staticmethod
-    def compute(interventions):
-        by_clause = defaultdict(lambda: {"count": 0, "total_cost": 0.0})
-        materials = defaultdict(float)
+class DemographicsAccumulator:
+    """
+    Incremental form of DemographicsService.compute: add() one costed
+    intervention at a time, result() at the end. Keeps only the running
+    aggregates, so streamed reports never hold every result in memory.
+    """
 
-        for item in interventions:
-            clause = item.get("clause_used") or "UNKNOWN"
-            cost_block = item.get("cost", {})
+    def __init__(self):
+        self.by_clause = defaultdict(lambda: {"count": 0, "total_cost": 0.0})
+        self.materials = defaultdict(float)
+        self.count = 0
 
-            total_cost = cost_block.get("total_cost", 0.0)
-            items = cost_block.get("items", [])   # ✅ FIX HERE
+    def add(self, item):
+        clause = item.get("clause_used") or "UNKNOWN"
+        cost_block = item.get("cost", {})
 
-            # Clause aggregation
-            by_clause[clause]["count"] += 1
-            by_clause[clause]["total_cost"] += total_cost
+        total_cost = cost_block.get("total_cost", 0.0)
+        items = cost_block.get("items", [])   # ✅ FIX HERE
 
-            # Material aggregation
-            for m in items:
-                mat_name = m.get("material")
-                amount = m.get("amount", 0.0)
+        # Clause aggregation
+        self.by_clause[clause]["count"] += 1
+        self.by_clause[clause]["total_cost"] += total_cost
 
-                if mat_name:
-                    materials[mat_name] += amount
+        # Material aggregation
+        for m in items:
+            mat_name = m.get("material")
+            amount = m.get("amount", 0.0)
 
+            if mat_name:
+                self.materials[mat_name] += amount
+
+        self.count += 1
+
+    def result(self):
         return {
-            "by_clause": dict(by_clause),
-            "materials": dict(materials),
+            "by_clause": dict(self.by_clause),
+            "materials": dict(self.materials),
             "kpis": {
-                "total_interventions": len(interventions),
-                "unique_clauses": len(by_clause),
+                "total_interventions": self.count,
+                "unique_clauses": len(self.by_clause),
                 "grand_total": round(
-                    sum(v["total_cost"] for v in by_clause.values()), 2
+                    sum(v["total_cost"] for v in self.by_clause.values()), 2
                 ),
             },
         }
+
+
+class DemographicsService:
+
+    @staticmethod
+    def compute(interventions):
+        acc = DemographicsAccumulator()
+        for item in interventions:
+            acc.add(item)
+        return acc.result()
@@ -1,7 +1,8 @@
 # backend/services/estimation_service.py
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from services.quantity_estimator import QuantityEstimator
+from services.intervention_classifier import KeywordClassifier
 import re
 
 class EstimationService:
@@ -15,67 +16,32 @@ class EstimationService:
     """
 
     def __init__(self, rulebook_path: str):
-        self.qe = QuantityEstimator(rulebook_path)
+        self._setup(QuantityEstimator(rulebook_path))
+
+    @classmethod
+    def from_rulebook(cls, rulebook: Dict[str, Any], version: str = None) -> "EstimationService":
+        """
+        Builds the service from an already-parsed rulebook; version is the
+        rulebook's stamp from services/data_registry.py.
+        """
+        service = cls.__new__(cls)
+        service._setup(QuantityEstimator.from_rulebook(rulebook), version)
+        return service
+
+    def _setup(self, qe: QuantityEstimator, version: str = None):
+        self.qe = qe
+        self.version = version
+        self.classifier = KeywordClassifier.from_rulebook(self.qe.rulebook)
 
     # ------------------------------------------------------------------
     # 1. CLASSIFY INTERVENTION TYPE
     # ------------------------------------------------------------------
     def classify_intervention(self, text: str) -> str:
-        t = text.lower()
-
-        # -------- SPEED / REGULATORY SIGNS --------
-        if "speed" in t and ("limit" in t or "maximum" in t):
-            return "SPEED_LIMIT_SIGN"
-
-        if "no parking" in t:
-            return "REGULATORY_SIGN_NOPARK"
-
-        # -------- PEDESTRIAN SIGN (NOT MARKING) --------
-        if "pedestrian" in t and "sign" in t:
-            return "INFORMATORY_SIGN"
-
-        # Zebra crossing repaint (must come FIRST)
-        if "pedestrian" in t and ("crossing" in t or "zebra" in t):
-            return "ZEBRA_CROSSING"
-
-# Generic repaint AFTER that
-        if "marking" in t or "repaint" in t or "painted" in t:
-            return "ROAD_MARKING"
-
-        # -------- SCHOOL AHEAD --------
-        if ("school" in t or "children" in t or "side") and "ahead" in t:
-            return "SCHOOL_AHEAD_SIGN"
-
-        # -------- INFORMATORY SIGNS --------
-        if any(word in t for word in ["fuel", "pump", "hospital", "parking", "petrol"]):
-            return "INFORMATORY_SIGN"
-
-        # -------- ROAD STUDS --------
-        if "stud" in t or "rpm" in t or "cat eye" in t:
-            return "ROAD_STUDS"
-
-        # -------- DELINEATORS --------
-        if "delineator" in t or "guide pole" in t:
-            return "DELINEATOR"
-
-        # -------- POTHOLES --------
-        if "pothole" in t or "patch" in t:
-            return "POTHOLE_REPAIR"
-
-        # -------- SOLAR BLINKER --------
-        if "solar blinker" in t:
-            return "SOLAR_BLINKER"
-
-        # -------- STREET LIGHT --------
-        if "street light" in t or "streetlight" in t:
-            return "STREET_LIGHT"
-        
-        if "FMM" in t or "fmm" in t:
-            return "FLEXIBLE_MEDIAN_MARKER"
-        
-
-
-        return None
+        """
+        Keyword classification; the keyword / priority table lives in the
+        "classify" entries of rulebook.json (services/intervention_classifier.py).
+        """
+        return self.classifier.classify(text)
 
     # ------------------------------------------------------------------
     # 2. COMPUTE LENGTH FROM CHAINAGE
@@ -180,37 +146,113 @@ class EstimationService:
     # ------------------------------------------------------------------
     # 4. MAIN ESTIMATION ENTRYPOINT
     # ------------------------------------------------------------------
-    def estimate(self, intervention: str, clause_key: str, chainage_m: dict) -> Dict[str, Any]:
+    def classify(self, intervention: str) -> Dict[str, Any]:
+        """
+        Classification stage: intervention type + clause quoted in the text.
+        """
+        return {
+            "intervention": intervention,
+            "intervention_type": self.classify_intervention(intervention),
+            "design_clause": self.extract_design_clause(intervention),
+        }
 
-        intervention_type = self.classify_intervention(intervention)
-        design_clause = self.extract_design_clause(intervention)
+    def _quantity_error(self, classified: Dict[str, Any], clause_key: str, message: str):
+        return {
+            "error": message,
+            "intervention": classified["intervention"],
+            "clause_used": clause_key,
+            "materials": {}
+        }
 
-        if not intervention_type:
-            return {
-                "error": "Could not determine intervention type",
+    def _quantity_result(self, classified: Dict[str, Any], params: dict, estimation: Dict[str, Any]):
+        return {
+            "intervention": classified["intervention"],
+            "clause_used": classified["design_clause"],
+            "intervention_type": classified["intervention_type"],
+            "params_used": estimation.get("params_used", params),
+            "materials": estimation.get("materials", {})
+        }
+
+    def classify_batch(self, interventions: List[str]) -> List[Dict[str, Any]]:
+        """
+        classify() for a whole report; the keyword scan runs once over all texts.
+        """
+        types = self.classifier.classify_batch(interventions)
+        return [
+            {
                 "intervention": intervention,
-                "clause_used": clause_key,
-                "materials": {}
+                "intervention_type": intervention_type,
+                "design_clause": self.extract_design_clause(intervention),
             }
+            for intervention, intervention_type in zip(interventions, types)
+        ]
+
+    def quantify(self, classified: Dict[str, Any], clause_key: str, chainage_m: dict) -> Dict[str, Any]:
+        """
+        Quantity stage: takes the output of classify().
+        """
+        intervention_type = classified["intervention_type"]
+        if not intervention_type:
+            return self._quantity_error(classified, clause_key, "Could not determine intervention type")
 
         params = self.prepare_params(intervention_type, chainage_m)
 
-        rule = self.qe.rulebook.get(intervention_type)
-        if not rule:
-            return {
-                "error": f"No rulebook entry for {intervention_type}",
-                "intervention": intervention,
-                "clause_used": clause_key,
-                "materials": {}
-            }
+        if not self.qe.rulebook.get(intervention_type):
+            return self._quantity_error(classified, clause_key, f"No rulebook entry for {intervention_type}")
 
         estimation = self.qe.estimate(intervention_type, params)
+        return self._quantity_result(classified, params, estimation)
 
-        return {
-            "intervention": intervention,
-            "clause_used": design_clause,
-            "intervention_type": intervention_type,
-            "params_used": estimation.get("params_used", params),
-            "materials": estimation.get("materials", {})
-            
-        }
+    def quantify_batch(self, items: List[Tuple[Dict[str, Any], dict]], clause_key: str = None) -> List[Any]:
+        """
+        Batch form of quantify() over (classified, chainage_m) pairs.
+
+        Interventions are grouped by type and each group is estimated in
+        one QuantityEstimator.estimate_batch call (NumPy over parameter
+        columns). Returns one quantify() result per item, in order; an item
+        whose quantity step raised gets the exception instead, so callers
+        can fail it individually.
+        """
+        results: List[Any] = [None] * len(items)
+        groups: Dict[str, List[Tuple[int, dict]]] = {}
+
+        for i, (classified, chainage_m) in enumerate(items):
+            intervention_type = classified["intervention_type"]
+            if not intervention_type:
+                results[i] = self._quantity_error(classified, clause_key, "Could not determine intervention type")
+                continue
+
+            try:
+                params = self.prepare_params(intervention_type, chainage_m)
+            except Exception as e:
+                results[i] = e
+                continue
+
+            if not self.qe.rulebook.get(intervention_type):
+                results[i] = self._quantity_error(classified, clause_key, f"No rulebook entry for {intervention_type}")
+                continue
+
+            groups.setdefault(intervention_type, []).append((i, params))
+
+        for intervention_type, rows in groups.items():
+            try:
+                estimations = self.qe.estimate_batch(intervention_type, [params for _, params in rows])
+            except Exception:
+                # Isolate the failing item(s) with the scalar path
+                estimations = []
+                for _, params in rows:
+                    try:
+                        estimations.append(self.qe.estimate(intervention_type, params))
+                    except Exception as e:
+                        estimations.append(e)
+
+            for (i, params), estimation in zip(rows, estimations):
+                if isinstance(estimation, Exception):
+                    results[i] = estimation
+                else:
+                    results[i] = self._quantity_result(items[i][0], params, estimation)
+
+        return results
+
+    def estimate(self, intervention: str, clause_key: str, chainage_m: dict) -> Dict[str, Any]:
+        return self.quantify(self.classify(intervention), clause_key, chainage_m)
@@ -0,0 +1,105 @@
+# backend/services/job_handlers.py
+"""
+Handlers for background jobs (services/job_queue.py).
+
+Each handler is called in a worker process as handler(payload, report)
+where report(progress_dict) publishes progress to GET /jobs/{id}.
+The return value must be JSON-serialisable; it becomes the job result.
+"""
+
+import os
+from typing import Any, Callable, Dict
+
+from core.extractor import iter_interventions, iter_pdf_lines
+from services.upload_store import load_cached_extraction, store_extraction, extraction_response
+
+Report = Callable[[Dict[str, Any]], None]
+
+
+def _get_estimator():
+    # Per worker process, from the data registry (reloaded when rulebook.json changes)
+    from services.data_registry import get_estimator
+    return get_estimator()
+
+
+# ---------------------------------------------------------
+# extract_pdf: same result shape as POST /extract/pdf
+# ---------------------------------------------------------
+def extract_pdf(payload: Dict[str, Any], report: Report) -> Dict[str, Any]:
+    file_path = payload["file_path"]
+    filename = payload.get("filename") or os.path.basename(file_path)
+    sha256 = payload.get("sha256")
+
+    cached = load_cached_extraction(sha256) if sha256 else None
+    if cached is not None:
+        report({"pages_read": None, "total_pages": None, "interventions_found": len(cached["interventions"])})
+        return extraction_response(filename, sha256, cached["interventions"], True)
+
+    progress = {"pages_read": 0, "total_pages": None, "interventions_found": 0}
+    seen_text = False
+
+    def on_page(pages_read, total_pages):
+        progress["pages_read"] = pages_read
+        progress["total_pages"] = total_pages
+        report(progress)
+
+    def lines():
+        nonlocal seen_text
+        for ln in iter_pdf_lines(file_path, on_page=on_page):
+            if not seen_text and ln.strip():
+                seen_text = True
+            yield ln
+
+    # Records stream out as pages are read, so interventions_found moves with pages_read
+    interventions = []
+    for record in iter_interventions(lines()):
+        interventions.append(record)
+        progress["interventions_found"] = len(interventions)
+
+    if not seen_text:
+        return {"error": "PDF text extraction returned empty text", "step": "read_pdf_empty"}
+    report(progress)
+
+    if sha256:
+        store_extraction(sha256, {"interventions": interventions})
+    return extraction_response(filename, sha256, interventions, False)
+
+
+# ---------------------------------------------------------
+# process_all: same result shape as POST /api/process-all
+# ---------------------------------------------------------
+def process_all(payload: Dict[str, Any], report: Report) -> Dict[str, Any]:
+    from services.process_pipeline import run_pipeline_stream
+    from services.sor_registry import resolve_catalog
+
+    interventions = payload["interventions"]
+    catalog_key = resolve_catalog(payload.get("catalog"))
+
+    progress = {"processed": 0, "total": len(interventions), "failed": 0}
+    report(progress)
+
+    results = []
+    summary = {}
+    for frame in run_pipeline_stream(_get_estimator(), interventions, catalog=catalog_key):
+        if frame["type"] == "intervention":
+            results.append(frame["data"])
+            progress["processed"] += 1
+            if "error" in frame["data"]:
+                progress["failed"] += 1
+            report(progress)
+        else:
+            summary = frame
+
+    return {
+        "interventions": results,
+        "catalog": str(catalog_key),
+        "failed": summary.get("failed", 0),
+        "grand_total": summary.get("grand_total", 0.0),
+        "demographics": summary.get("demographics", {})
+    }
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any], Report], Any]] = {
+    "extract_pdf": extract_pdf,
+    "process_all": process_all,
+}
@@ -0,0 +1,362 @@
+# backend/services/job_queue.py
+"""
+Job Queue
+---------
+Persistent background jobs for long-running work (PDF extraction,
+full-report processing).
+
+    JobStore       SQLite-backed queue + status table (data/jobs.sqlite)
+    JobWorkerPool  N worker processes draining the queue
+
+A job moves queued -> running -> done | failed. Jobs are rows in SQLite,
+so queued work survives a server restart.
+
+A claimed job carries a lease: the pid of the worker running it and an
+expiry time, renewed by a heartbeat while the handler runs. Only jobs
+whose lease has expired (the worker died, or the server went down) are
+put back in the queue, so several server processes can share one
+database without running each other's jobs twice. Each pool checks its
+workers every few seconds, respawns the dead ones and requeues expired
+leases.
+
+Config:
+    JOBS_DB_PATH   SQLite file (default data/jobs.sqlite)
+    JOBS_WORKERS   worker processes per server process (default 2)
+    JOBS_MAX_RUNNING  jobs running at once across all processes sharing
+                   the database (default JOBS_WORKERS)
+    JOBS_MAX_ATTEMPTS  give up on a job after this many starts (default 3)
+    JOBS_LEASE_SECONDS  lease length; heartbeats renew it every third of it (default 30)
+"""
+
+import datetime
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Dict, List, Optional
+
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", os.path.join("data", "jobs.sqlite"))
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", 2))
+JOBS_MAX_RUNNING = int(os.environ.get("JOBS_MAX_RUNNING", JOBS_WORKERS))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", 3))
+JOBS_LEASE_SECONDS = float(os.environ.get("JOBS_LEASE_SECONDS", 30))
+POLL_INTERVAL_S = 0.5
+SUPERVISE_INTERVAL_S = 5.0
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    progress    TEXT NOT NULL DEFAULT '{}',
+    result      TEXT,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT,
+    lease_owner INTEGER,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+# Columns added after the first release, for databases created before them
+_MIGRATIONS = {
+    "lease_owner": "ALTER TABLE jobs ADD COLUMN lease_owner INTEGER",
+    "lease_expires": "ALTER TABLE jobs ADD COLUMN lease_expires REAL",
+}
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+
+class JobStore:
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, lease_seconds: float = JOBS_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            for column, ddl in _MIGRATIONS.items():
+                if column not in columns:
+                    try:
+                        conn.execute(ddl)
+                    except sqlite3.OperationalError:
+                        # Another process added it first
+                        pass
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call: safe across threads and processes
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    # --------------------------------------------------
+    # PRODUCER SIDE
+    # --------------------------------------------------
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, STATUS_QUEUED, json.dumps(payload), _now()),
+            )
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": json.loads(row["progress"] or "{}"),
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    # --------------------------------------------------
+    # WORKER SIDE
+    # --------------------------------------------------
+    def claim(self, owner: int, max_running: int = JOBS_MAX_RUNNING) -> Optional[Dict[str, Any]]:
+        """
+        Atomically takes the oldest queued job, marks it running and leases
+        it to owner (a worker pid). Returns None when the queue is empty or
+        max_running jobs already hold a live lease.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1,
+                                lease_owner = ?, lease_expires = ?
+                WHERE id = (
+                    SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1
+                )
+                AND (SELECT COUNT(*) FROM jobs WHERE status = ? AND lease_expires > ?) < ?
+                RETURNING id, kind, payload, attempts
+                """,
+                (STATUS_RUNNING, _now(), owner, now + self.lease_seconds,
+                 STATUS_QUEUED, STATUS_RUNNING, now, max_running),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"]), "attempts": row["attempts"]}
+
+    def renew_lease(self, job_id: str, owner: int) -> bool:
+        """Extends owner's lease on a running job; False if it no longer holds it."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                (time.time() + self.lease_seconds, job_id, STATUS_RUNNING, owner),
+            )
+            return cur.rowcount > 0
+
+    def set_progress(self, job_id: str, progress: Dict[str, Any]):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def finish(self, job_id: str, result: Any, owner: Optional[int] = None):
+        self._complete(job_id, owner, STATUS_DONE, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str, owner: Optional[int] = None):
+        self._complete(job_id, owner, STATUS_FAILED, error=error)
+
+    def _complete(self, job_id: str, owner: Optional[int], status: str,
+                  result: Optional[str] = None, error: Optional[str] = None):
+        # With an owner, only while it still holds the lease: after it
+        # expired the job may have been requeued and claimed by another worker
+        sql = ("UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_owner = NULL, "
+               "lease_expires = NULL WHERE id = ?")
+        args = [status, result, error, _now(), job_id]
+        if owner is not None:
+            sql += " AND status = ? AND lease_owner = ?"
+            args += [STATUS_RUNNING, owner]
+        with self._connect() as conn:
+            conn.execute(sql, args)
+
+    def requeue_interrupted(self, max_attempts: int = JOBS_MAX_ATTEMPTS) -> int:
+        """
+        Puts running jobs whose lease has expired (their worker or server
+        process died) back in the queue, or fails them once they have used
+        up max_attempts. Jobs under a live lease are left alone.
+        """
+        expired = "status = ? AND (lease_expires IS NULL OR lease_expires <= ?)"
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL, lease_expires = NULL "
+                f"WHERE {expired} AND attempts >= ?",
+                (STATUS_FAILED, "Interrupted too many times", _now(), STATUS_RUNNING, now, max_attempts),
+            )
+            cur = conn.execute(
+                f"UPDATE jobs SET status = ?, started_at = NULL, lease_owner = NULL, lease_expires = NULL "
+                f"WHERE {expired}",
+                (STATUS_QUEUED, STATUS_RUNNING, now),
+            )
+            return cur.rowcount
+
+
+# ---------------------------------------------------------
+# WORKERS
+# ---------------------------------------------------------
+def _heartbeat(store: JobStore, job_id: str, owner: int, done: threading.Event):
+    while not done.wait(store.lease_seconds / 3):
+        if not store.renew_lease(job_id, owner):
+            print(f"[JOB {job_id}] lost its lease")
+            return
+
+
+def _worker_main(db_path: str, stop_flag, max_running: int = JOBS_MAX_RUNNING):
+    from services.job_handlers import HANDLERS
+
+    store = JobStore(db_path)
+    owner = os.getpid()
+
+    while not stop_flag.value:
+        job = store.claim(owner, max_running)
+        if job is None:
+            time.sleep(POLL_INTERVAL_S)
+            continue
+
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            store.fail(job["id"], f"Unknown job kind: {job['kind']}", owner)
+            continue
+
+        done = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(store, job["id"], owner, done), daemon=True)
+        heartbeat.start()
+        try:
+            result = handler(job["payload"], lambda progress: store.set_progress(job["id"], progress))
+        except Exception as e:
+            print(f"[JOB {job['id']}] failed:\n{traceback.format_exc()}")
+            store.fail(job["id"], str(e), owner)
+        else:
+            store.finish(job["id"], result, owner)
+        finally:
+            done.set()
+            heartbeat.join()
+
+
+class JobWorkerPool:
+
+    def __init__(self, db_path: str = JOBS_DB_PATH, concurrency: int = JOBS_WORKERS,
+                 max_running: int = JOBS_MAX_RUNNING):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.max_running = max_running
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = None
+        self._processes: List[multiprocessing.Process] = []
+        self._supervisor: Optional[threading.Thread] = None
+        self._supervisor_stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _spawn(self, i: int) -> multiprocessing.Process:
+        p = self._ctx.Process(
+            target=_worker_main, args=(self.db_path, self._stop, self.max_running),
+            name=f"job-worker-{i}", daemon=True
+        )
+        p.start()
+        return p
+
+    def _requeue(self):
+        requeued = JobStore(self.db_path).requeue_interrupted()
+        if requeued:
+            print(f"Re-queued {requeued} interrupted job(s)")
+
+    def _supervise(self):
+        while not self._supervisor_stop.wait(SUPERVISE_INTERVAL_S):
+            with self._lock:
+                if self._stop.value:
+                    return
+                for i, p in enumerate(self._processes):
+                    if not p.is_alive():
+                        print(f"Job worker {p.name} (pid {p.pid}) exited with {p.exitcode}; respawning")
+                        self._processes[i] = self._spawn(i)
+            try:
+                self._requeue()
+            except sqlite3.Error as e:
+                print(f"Re-queueing interrupted jobs failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._processes:
+                return
+            self._requeue()
+
+            # A lock-free flag rather than an Event: a worker killed while
+            # waiting on an Event leaves it unable to be set
+            self._stop = self._ctx.RawValue("b", 0)
+            self._processes = [self._spawn(i) for i in range(self.concurrency)]
+
+            self._supervisor_stop.clear()
+            self._supervisor = threading.Thread(target=self._supervise, name="job-supervisor", daemon=True)
+            self._supervisor.start()
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            if not self._processes:
+                return
+            self._stop.value = 1
+            self._supervisor_stop.set()
+        self._supervisor.join()
+
+        deadline = time.monotonic() + timeout
+        for p in self._processes:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+        self._processes = []
+
+    def alive(self) -> int:
+        return sum(p.is_alive() for p in self._processes)
+
+
+_STORE: Optional[JobStore] = None
+_POOL: Optional[JobWorkerPool] = None
+
+
+def get_job_store() -> JobStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = JobStore()
+    return _STORE
+
+
+def get_worker_pool() -> JobWorkerPool:
+    global _POOL
+    if _POOL is None:
+        _POOL = JobWorkerPool()
+    return _POOL
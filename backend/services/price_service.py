@@ -2,16 +2,24 @@
 Price Service
 -------------
 Provides:
-    - find_best_sor_match(material, qty, unit)
+    - find_best_sor_match(material, qty, unit, catalog=None)
+    - find_best_sor_matches([(material, qty, unit), ...], catalog=None)
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 import pandas as pd
+import numpy as np
 import re
+import sys
 import logging
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 
-__all__ = ["find_best_sor_match"]
+from services.sor_blocking import BlockingIndex, MIN_ROWS as BLOCKING_MIN_ROWS
+from services.sor_catalog import CompiledCatalog
+from services.sor_match_table import lookup_match
+from services.sor_registry import CatalogSelector, get_registry, resolve_catalog
+
+__all__ = ["find_best_sor_match", "find_best_sor_matches", "SORMatcher"]
 
 logger = logging.getLogger("services.price_service")
 logger.setLevel(logging.INFO)
@@ -20,24 +28,19 @@ if not logger.handlers:
     handler = logging.StreamHandler()
     logger.addHandler(handler)
 
-_SOR_DF = None
-
-
-def load_sor_csv(path: str = "data/sor_csv/2023/roads.csv") -> pd.DataFrame:
-    global _SOR_DF
+SOR_CSV_PATH = "data/sor_csv/2023/roads.csv"
 
-    if _SOR_DF is None:
-        logger.info(f"Loading SOR CSV from {path}")
-        df = pd.read_csv(path)
-        df.fillna("", inplace=True)
-        df.columns = [c.lower().strip() for c in df.columns]
 
-        if not {"description", "unit", "unit_rate"}.issubset(df.columns):
-            raise ValueError("SOR CSV must contain description, unit, unit_rate")
+def read_sor_csv(path: str) -> pd.DataFrame:
+    logger.info(f"Loading SOR CSV from {path}")
+    df = pd.read_csv(path)
+    df.fillna("", inplace=True)
+    df.columns = [c.lower().strip() for c in df.columns]
 
-        _SOR_DF = df
+    if not {"description", "unit", "unit_rate"}.issubset(df.columns):
+        raise ValueError("SOR CSV must contain description, unit, unit_rate")
 
-    return _SOR_DF
+    return df
 
 
 STOPWORDS = {"mm", "for", "in", "and", "of", "with"}
@@ -72,40 +75,293 @@ def unit_score(material_unit, sor_unit) -> float:
     return 0.0
 
 
-def find_best_sor_match(material: str, qty: float, unit: Optional[str]) -> Dict[str, Any]:
-    df = load_sor_csv()
+def parse_rate(rate) -> Optional[float]:
+    return float(rate) if str(rate).replace(".", "", 1).isdigit() else None
+
+
+# --------------------------------------------------
+# VECTORIZED MATCHER
+# --------------------------------------------------
+class SORMatcher:
+    """
+    Scores a batch of material queries against a whole SOR catalog at once.
+
+    Normalized descriptions, lower-cased units and parsed rates are computed
+    once when the matcher is built; each batch is one rapidfuzz ``cdist``
+    call plus a NumPy unit-score matrix. Scores and tie-breaking are the
+    same as the per-row loop (first row with the highest score wins).
+
+    Large catalogs are first pruned with a trigram blocking index
+    (services/sor_blocking.py); only the surviving rows are fuzzy-scored.
+    """
+
+    FUZZ_WEIGHT = 0.7
+    UNIT_WEIGHT = 0.3
+
+    def __init__(
+        self,
+        descriptions: Sequence[str],
+        units: Sequence[str],
+        rates: Sequence[Optional[float]],
+        normalized: Optional[Sequence[str]] = None,
+        blocking: Optional[bool] = None,
+    ):
+        # descriptions / normalized may be lazily decoded StringTables over
+        # a memory-mapped compiled catalog: kept as-is, not copied per worker
+        self.descriptions = descriptions
+        self.normalized = normalized if normalized is not None else [normalize(d) for d in descriptions]
+        self.units = np.array([u.lower() for u in units], dtype=object)
+        self.rates = np.array(
+            [np.nan if r is None else r for r in rates], dtype=np.float64
+        ) if isinstance(rates, list) else np.asarray(rates, dtype=np.float64)
+        self.row_count = len(self.normalized)
+
+        # Equivalence group of each SOR unit (-1 = no group)
+        self._group_ids = {name: gid for gid, name in enumerate(UNIT_EQUIVALENCE)}
+        if self.row_count:
+            distinct, inverse = np.unique(self.units.astype(str), return_inverse=True)
+            groups = np.array([self._unit_group(u) for u in distinct], dtype=np.int16)
+            self.unit_groups = groups[inverse.reshape(-1)]
+        else:
+            self.unit_groups = np.empty(0, dtype=np.int16)
+        self._unit_empty = self.units == ""
+
+        # None = decide by catalog size (see blocking_index)
+        self.blocking = blocking
+        self._blocking_index: Optional[BlockingIndex] = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "SORMatcher":
+        return cls(
+            descriptions=[str(d) for d in df["description"]],
+            units=[str(u) for u in df["unit"]],
+            rates=[parse_rate(r) for r in df["unit_rate"]],
+        )
+
+    @classmethod
+    def from_catalog(cls, catalog: CompiledCatalog) -> "SORMatcher":
+        """Builds a matcher over a memory-mapped compiled catalog."""
+        return cls(
+            descriptions=catalog.descriptions,
+            units=catalog.units(),
+            rates=catalog.rates,
+            normalized=catalog.normalized,
+        )
+
+    def _unit_group(self, unit: str) -> int:
+        for name, group in UNIT_EQUIVALENCE.items():
+            if unit in group:
+                return self._group_ids[name]
+        return -1
+
+    def unit_scores(self, material_unit: Optional[str]) -> np.ndarray:
+        """Vectorized ``unit_score(material_unit, sor_unit)`` over every row."""
+        if not material_unit:
+            return np.full(self.row_count, 0.4)
+
+        scores = np.zeros(self.row_count)
+        group = self._unit_group(material_unit)
+        if group >= 0:
+            scores[self.unit_groups == group] = 0.8
+        scores[self.units == material_unit] = 1.0
+        scores[self._unit_empty] = 0.4
+        return scores
+
+    def blocking_index(self) -> Optional[BlockingIndex]:
+        """
+        Trigram blocking index, built on first use. None when blocking is
+        off (by default for catalogs under SOR_BLOCKING_MIN_ROWS rows, where
+        a full scan is cheaper than the lookup).
+        """
+        enabled = self.blocking if self.blocking is not None else self.row_count >= BLOCKING_MIN_ROWS
+        if not enabled:
+            return None
+
+        if self._blocking_index is None:
+            self._blocking_index = BlockingIndex(self.normalized)
+
+        return self._blocking_index
+
+    def _score_batch(self, materials: List[str], units: List[Optional[str]]):
+        """
+        Yields (fuzz_scores, unit_scores, final_scores) per material.
+        Rows pruned by the blocking index get a final score of -1.
+        """
+        queries = [normalize(m) for m in materials]
+
+        blocking = self.blocking_index()
+        candidate_rows = blocking.candidates_batch(queries) if blocking else [None] * len(queries)
+
+        unit_cache: Dict[Optional[str], np.ndarray] = {}
+        unit_rows = []
+        for unit in units:
+            material_unit = unit.lower() if unit else None
+            if material_unit not in unit_cache:
+                unit_cache[material_unit] = self.unit_scores(material_unit)
+            unit_rows.append(unit_cache[material_unit])
+
+        # Queries the recall guard passed are scored on their candidates only
+        candidate_fuzz: Dict[int, np.ndarray] = {}
+        for qi, rows in enumerate(candidate_rows):
+            if rows is None:
+                continue
+            candidate_fuzz[qi] = process.cdist(
+                [queries[qi]],
+                [self.normalized[r] for r in rows],
+                scorer=fuzz.token_set_ratio,
+                dtype=np.float64,
+            )[0] / 100
+
+        # Full-scan queries share one cdist call
+        full_scan = [qi for qi, rows in enumerate(candidate_rows) if rows is None]
+        full_row = {qi: i for i, qi in enumerate(full_scan)}
+        full_matrix = process.cdist(
+            [queries[qi] for qi in full_scan],
+            self.normalized,
+            scorer=fuzz.token_set_ratio,
+            dtype=np.float64,
+            workers=-1,
+        ) / 100 if full_scan else None
+
+        for qi, u_scores in enumerate(unit_rows):
+            rows = candidate_rows[qi]
+            if rows is None:
+                fuzz_scores = full_matrix[full_row[qi]]
+                scores = self.FUZZ_WEIGHT * fuzz_scores + self.UNIT_WEIGHT * u_scores
+            else:
+                fuzz_scores = np.zeros(self.row_count)
+                fuzz_scores[rows] = candidate_fuzz[qi]
+                scores = np.full(self.row_count, -1.0)
+                scores[rows] = self.FUZZ_WEIGHT * fuzz_scores[rows] + self.UNIT_WEIGHT * u_scores[rows]
+
+            yield fuzz_scores, u_scores, scores
+
+    def match_batch(self, materials: List[str], units: List[Optional[str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Returns the ``best_match`` dict (or None) for each material, in order.
+        """
+        if not materials:
+            return []
+        if not self.row_count:
+            return [None] * len(materials)
+
+        matches = []
+        for fuzz_scores, u_scores, scores in self._score_batch(materials, units):
+            best = int(np.argmax(scores))
+            matches.append(self.build_match(best, fuzz_scores[best], u_scores[best], scores[best]))
+
+        return matches
+
+    def rank_batch(self, materials: List[str], units: List[Optional[str]], top_n: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Returns the ``top_n`` best rows for each material, best first.
+        Ties keep catalog order, so ``rank_batch(...)[i][0]`` equals
+        ``match_batch(...)[i]``.
+        """
+        if not materials:
+            return []
+        if not self.row_count:
+            return [[] for _ in materials]
+
+        ranked = []
+        for fuzz_scores, u_scores, scores in self._score_batch(materials, units):
+            order = np.argsort(-scores, kind="stable")[:top_n]
+            order = order[scores[order] >= 0]
+            ranked.append([
+                self.build_match(int(r), fuzz_scores[r], u_scores[r], scores[r])
+                for r in order
+            ])
+
+        return ranked
+
+    def memory_bytes(self) -> int:
+        """Rough resident size, used by the SOR registry's memory budget."""
+        size = self.rates.nbytes + self.unit_groups.nbytes + self._unit_empty.nbytes
+        size += self.units.nbytes + sum(sys.getsizeof(u) for u in set(self.units))
+        # StringTables live in shared mmap pages, not this process's heap
+        if isinstance(self.normalized, list):
+            size += sum(sys.getsizeof(t) for t in self.normalized)
+        if isinstance(self.descriptions, list):
+            size += sum(sys.getsizeof(d) for d in self.descriptions)
+        if self._blocking_index is not None:
+            postings = self._blocking_index.postings
+            size += postings.data.nbytes + postings.indices.nbytes + postings.indptr.nbytes
+        return size
+
+    def build_match(self, row: int, fuzz_score: float, u_score: float, score: float) -> Dict[str, Any]:
+        return {
+            "description": self.descriptions[row],
+            "unit": self.units[row],
+            "rate": None if np.isnan(self.rates[row]) else float(self.rates[row]),
+            "fuzz_score": round(float(fuzz_score), 3),
+            "unit_score": round(float(u_score), 3),
+            "final_score": round(float(score), 3),
+        }
+
+
+def get_sor_matcher(catalog: CatalogSelector = None) -> SORMatcher:
+    """Matcher for a catalog selector (see services/sor_registry.py)."""
+    return get_registry().get_matcher(catalog)
+
+
+# --------------------------------------------------
+# PUBLIC API
+# --------------------------------------------------
+def find_best_sor_matches(
+    requests: List[Tuple[str, float, Optional[str]]],
+    catalog: CatalogSelector = None,
+) -> List[Dict[str, Any]]:
+    """
+    Batch version of find_best_sor_match.
+
+    requests: [(material, qty, unit), ...]
+    catalog:  SOR catalog selector, e.g. "2023/roads" (default catalog if None)
+    Returns one result per request, in the same order.
+
+    Rulebook material codes are served from the precomputed match table
+    (services/sor_match_table.py) when it is up to date; everything else
+    is matched live against the catalog in a single batch.
+    """
+    registry = get_registry()
+    key = resolve_catalog(catalog)
+    csv_path = registry.csv_path(key)
 
-    query = normalize(material)
-    material_unit = unit.lower() if unit else None
+    best_matches: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+    misses = []
 
-    best, best_score = None, -1
+    for i, (material, _, unit) in enumerate(requests):
+        entry = lookup_match(csv_path, material, unit)
+        if entry is not None:
+            best_matches[i] = entry["best_match"]
+        else:
+            misses.append(i)
 
-    for _, row in df.iterrows():
-        desc = normalize(str(row["description"]))
-        sor_unit = str(row.get("unit", "")).lower()
-        rate = row.get("unit_rate")
+    if misses:
+        live = registry.get_matcher(key).match_batch(
+            [requests[i][0] for i in misses],
+            [requests[i][2] for i in misses],
+        )
+        for i, best in zip(misses, live):
+            best_matches[i] = best
 
-        fuzz_score = fuzz.token_set_ratio(query, desc) / 100
-        u_score = unit_score(material_unit, sor_unit)
-        score = 0.7 * fuzz_score + 0.3 * u_score
+    results = []
+    for (material, qty, unit), best in zip(requests, best_matches):
+        estimated_cost = best["rate"] * qty if best and best["rate"] else None
+        results.append({
+            "material": material,
+            "qty": qty,
+            "unit": unit,
+            "best_match": best,
+            "estimated_cost": estimated_cost,
+        })
 
-        if score > best_score:
-            best_score = score
-            best = {
-                "description": row["description"],
-                "unit": sor_unit,
-                "rate": float(rate) if str(rate).replace(".", "", 1).isdigit() else None,
-                "fuzz_score": round(fuzz_score, 3),
-                "unit_score": round(u_score, 3),
-                "final_score": round(score, 3),
-            }
+    return results
 
-    estimated_cost = best["rate"] * qty if best and best["rate"] else None
 
-    return {
-        "material": material,
-        "qty": qty,
-        "unit": unit,
-        "best_match": best,
-        "estimated_cost": estimated_cost,
-    }
+def find_best_sor_match(
+    material: str,
+    qty: float,
+    unit: Optional[str],
+    catalog: CatalogSelector = None,
+) -> Dict[str, Any]:
+    return find_best_sor_matches([(material, qty, unit)], catalog=catalog)[0]
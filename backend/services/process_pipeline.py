@@ -0,0 +1,301 @@
+# backend/services/process_pipeline.py
+"""
+Process-All Pipeline
+--------------------
+Runs /api/process-all as explicit stages:
+
+    classify -> quantity -> template -> price -> aggregate
+
+Classification and quantity estimation are cheap and run in the request
+thread. Types whose quantities are linear in one driver (count, length_m)
+are costed from a cached template (services/cost_templates.py); the rest
+go through pricing. Pricing (SOR matching) is the CPU-heavy stage: it is planned over
+the whole request so every distinct material is priced once, and the
+unique materials are fanned out over a shared pool in chunks:
+
+    PROCESS_ALL_POOL         "thread" (default) or "process"
+    PROCESS_ALL_WORKERS      pool size (default: min(8, CPU count))
+    PROCESS_ALL_PRICE_CHUNK  unique materials per pool task (default 64)
+
+Results always come back in input order. A failure in any stage is
+reported inline on that intervention ("error", "stage") instead of
+failing the whole request.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from services.cost_engine import build_cost_breakdown, load_installation_costs, material_unit, price_materials
+from services.cost_templates import get_template
+from services.demographics_service import DemographicsAccumulator
+from services.estimation_service import EstimationService
+from services.sor_registry import CatalogSelector
+
+PIPELINE_POOL = os.environ.get("PROCESS_ALL_POOL", "thread").lower()
+PIPELINE_WORKERS = int(os.environ.get("PROCESS_ALL_WORKERS", min(8, os.cpu_count() or 1)))
+# Unique materials per pricing task
+PRICE_CHUNK_SIZE = int(os.environ.get("PROCESS_ALL_PRICE_CHUNK", 64))
+# Interventions per pipeline pass in streaming mode
+STREAM_CHUNK_SIZE = int(os.environ.get("PROCESS_ALL_STREAM_CHUNK", 16))
+
+_EXECUTOR: Optional[Executor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor() -> Executor:
+    global _EXECUTOR
+
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                if PIPELINE_POOL == "process":
+                    # spawn, not fork: the server process is threaded
+                    _EXECUTOR = ProcessPoolExecutor(
+                        max_workers=PIPELINE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    _EXECUTOR = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="process-all")
+
+    return _EXECUTOR
+
+
+def _failure(item: Dict[str, Any], stage: str, error: Exception) -> Dict[str, Any]:
+    return {
+        "intervention": item.get("intervention") if isinstance(item, dict) else None,
+        "chainage": item.get("chainage") if isinstance(item, dict) else None,
+        "clause_used": None,
+        "cost": {"items": [], "total_cost": 0.0},
+        "error": f"Failed to process intervention: {error}",
+        "stage": stage,
+    }
+
+
+# ---------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------
+def classify_stage(estimator: EstimationService, interventions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    records = [{"item": item} for item in interventions]
+
+    # Well-formed items are classified in one batch; anything else goes
+    # through classify() alone so its failure is reported per item
+    batch = [
+        record for record in records
+        if isinstance(record["item"], dict) and isinstance(record["item"].get("intervention"), str)
+    ]
+    try:
+        classified = estimator.classify_batch([record["item"]["intervention"] for record in batch])
+        for record, result in zip(batch, classified):
+            record["classified"] = result
+    except Exception:
+        pass
+
+    for record in records:
+        if "classified" in record:
+            continue
+        try:
+            record["classified"] = estimator.classify(record["item"]["intervention"])
+        except Exception as e:
+            record["failure"] = _failure(record["item"], "classify", e)
+    return records
+
+
+def quantity_stage(estimator: EstimationService, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Quantities for the whole batch at once: EstimationService groups the
+    interventions by type and evaluates each rulebook formula over NumPy
+    parameter columns.
+    """
+    pending = [record for record in records if "failure" not in record]
+    estimates = estimator.quantify_batch(
+        [(record["classified"], record["item"].get("chainage_m", {})) for record in pending],
+        clause_key=None  # ⚠️ USE extracted clause, not matcher
+    )
+
+    for record, estimate in zip(pending, estimates):
+        if isinstance(estimate, Exception):
+            record["failure"] = _failure(record["item"], "quantity", estimate)
+        else:
+            record["estimate"] = estimate
+    return records
+
+
+def _price_chunk(keys: List[Tuple[str, Optional[str]]], catalog: CatalogSelector):
+    # Top-level so it can be shipped to a process pool
+    return price_materials(keys, catalog=catalog)
+
+
+def plan_materials(records: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Planning phase: the distinct (material code, unit) keys needed by
+    every estimated intervention. The catalog is fixed per request, so
+    this is the full pricing key set.
+    """
+    keys = {}
+    for record in records:
+        if "failure" in record or "cost" in record:
+            continue
+        for material in record["estimate"].get("materials", {}):
+            keys[(material, material_unit(material))] = None
+    return list(keys)
+
+
+def template_stage(records: List[Dict[str, Any]], rules: Dict[str, Any],
+                   catalog: CatalogSelector = None) -> List[Dict[str, Any]]:
+    """
+    Linear fast path (services/cost_templates.py): interventions whose type
+    is linear in one driver are costed from a cached per-catalog template.
+    Anything the template cannot reproduce is left for price_stage.
+    """
+    for record in records:
+        if "failure" in record:
+            continue
+        est = record["estimate"]
+        rule = rules.get(est.get("intervention_type"))
+        if rule is None or "params_used" not in est:
+            continue
+        try:
+            template = get_template(rule, est["params_used"], catalog)
+            cost = template.breakdown(est["params_used"]) if template is not None else None
+        except Exception:
+            cost = None
+        if cost is not None:
+            record["cost"] = cost
+    return records
+
+
+def price_stage(records: List[Dict[str, Any]], catalog: CatalogSelector = None,
+                executor: Optional[Executor] = None,
+                best_matches: Optional[Dict[Tuple[str, Optional[str]], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Prices each unique material once for the whole request, then fans the
+    rates back out into every intervention's cost breakdown. SOR work
+    scales with the number of distinct materials, not with line items.
+
+    best_matches: optional price cache shared across calls (streaming mode
+    prices chunk by chunk); keys already in it are not priced again.
+    """
+    executor = executor or get_executor()
+    if best_matches is None:
+        best_matches = {}
+    keys = [key for key in plan_materials(records) if key not in best_matches]
+
+    # Large key sets are split across the pool; results are merged by key
+    chunks = [keys[i:i + PRICE_CHUNK_SIZE] for i in range(0, len(keys), PRICE_CHUNK_SIZE)]
+    futures = [(chunk, executor.submit(_price_chunk, chunk, catalog)) for chunk in chunks]
+
+    failed_keys = {}
+    for chunk, future in futures:
+        try:
+            best_matches.update(future.result())
+        except Exception as e:
+            failed_keys.update((key, e) for key in chunk)
+
+    installation_map = load_installation_costs()
+
+    for record in records:
+        if "failure" in record or "cost" in record:
+            continue
+        est = record["estimate"]
+        materials = est.get("materials", {})
+        try:
+            for material in materials:
+                error = failed_keys.get((material, material_unit(material)))
+                if error is not None:
+                    raise error
+            record["cost"] = build_cost_breakdown(
+                materials, est.get("intervention_type"), best_matches, installation_map
+            )
+        except Exception as e:
+            record["failure"] = _failure(record["item"], "price", e)
+    return records
+
+
+def record_result(record: Dict[str, Any]) -> Dict[str, Any]:
+    """The response entry for one processed record."""
+    if "failure" in record:
+        return record["failure"]
+
+    est = record["estimate"]
+    return {
+        "intervention": est.get("intervention"),
+        "chainage": record["item"].get("chainage"),
+        "clause_used": est.get("clause_used"),
+        "cost": record["cost"]
+    }
+
+
+def aggregate_stage(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    results = []
+    demographics = DemographicsAccumulator()
+    grand_total = 0.0
+
+    for record in records:
+        result = record_result(record)
+        results.append(result)
+        if "failure" in record:
+            continue
+        demographics.add(result)
+        grand_total += result["cost"]["total_cost"]
+
+    return {
+        "interventions": results,
+        "failed": len(results) - demographics.count,
+        "grand_total": round(grand_total, 2),
+        "demographics": demographics.result()
+    }
+
+
+def run_pipeline(estimator: EstimationService, interventions: List[Dict[str, Any]],
+                 catalog: CatalogSelector = None) -> Dict[str, Any]:
+    records = classify_stage(estimator, interventions)
+    records = quantity_stage(estimator, records)
+    records = template_stage(records, estimator.qe.rules, catalog=catalog)
+    records = price_stage(records, catalog=catalog)
+    return aggregate_stage(records)
+
+
+def run_pipeline_stream(estimator: EstimationService, interventions: List[Dict[str, Any]],
+                        catalog: CatalogSelector = None,
+                        chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming form of run_pipeline. Runs the stages over chunk_size
+    interventions at a time and yields
+
+        {"type": "intervention", "index": i, "data": {...}}
+
+    for each one, in input order, then a final
+
+        {"type": "summary", "failed": n, "grand_total": x, "demographics": {...}}
+
+    Only running totals are kept between chunks, plus the per-request
+    price cache so each distinct material is still priced once.
+    """
+    best_matches: Dict[Tuple[str, Optional[str]], Any] = {}
+    demographics = DemographicsAccumulator()
+    grand_total = 0.0
+    failed = 0
+
+    for start in range(0, len(interventions), chunk_size):
+        records = classify_stage(estimator, interventions[start:start + chunk_size])
+        records = quantity_stage(estimator, records)
+        records = template_stage(records, estimator.qe.rules, catalog=catalog)
+        records = price_stage(records, catalog=catalog, best_matches=best_matches)
+
+        for offset, record in enumerate(records):
+            result = record_result(record)
+            if "failure" in record:
+                failed += 1
+            else:
+                demographics.add(result)
+                grand_total += result["cost"]["total_cost"]
+            yield {"type": "intervention", "index": start + offset, "data": result}
+
+    yield {
+        "type": "summary",
+        "failed": failed,
+        "grand_total": round(grand_total, 2),
+        "demographics": demographics.result()
+    }
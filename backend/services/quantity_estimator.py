@@ -1,5 +1,15 @@
-import math
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from services.rule_formulas import CompiledFormula, compile_rulebook
+
+logger = logging.getLogger("services.quantity_estimator")
+
+
+def _is_plain_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 
 class QuantityEstimator:
@@ -10,6 +20,9 @@ class QuantityEstimator:
         { "code": "ITEM_m2", "qty_formula": "(width_mm * height_mm)/1e6" },
         { "code": "MS_POST_nos", "qty_formula": "count" }
     ]
+
+    Formulas are compiled once when the rulebook is loaded
+    (services/rule_formulas.py); problems are logged then.
     """
 
     def __init__(self, rulebook_path: str):
@@ -19,50 +32,42 @@ class QuantityEstimator:
             raise FileNotFoundError(f"Rulebook not found at {rulebook_path}")
 
         with open(rulebook_path, "r", encoding="utf-8") as f:
-            self.rulebook = json.load(f)
+            self._load(json.load(f))
+
+    @classmethod
+    def from_rulebook(cls, rulebook: Dict[str, Any]) -> "QuantityEstimator":
+        """Builds the estimator from an already-parsed rulebook."""
+        estimator = cls.__new__(cls)
+        estimator._load(rulebook)
+        return estimator
+
+    def _load(self, rulebook: Dict[str, Any]):
+        self.rulebook = rulebook
+        self.rules, self.problems = compile_rulebook(self.rulebook)
 
     # --------------------------------------------------------------
     # SAFE FORMULA EVALUATION (CRITICAL FIX)
     # --------------------------------------------------------------
-    def _eval_formula(self, formula: str, params: dict) -> float:
-        try:
-            # Ensure params is always a dict
-            safe_locals = dict(params) if params else {}
-
-            # Explicitly allow safe functions
-            safe_locals.update({
-                "math": math,
-                "int": int,
-                "round": round,
-                "max": max,
-                "min": min,
-                "float": float
-            })
-
-            value = eval(
-                formula,
-                {"__builtins__": {}},   # no unsafe builtins
-                safe_locals
-            )
-
-            return float(value)
+    def _eval_compiled(self, formula: CompiledFormula, params: dict) -> float:
+        # Params the formula needs but the call did not supply evaluate to 0
+        # (undeclared ones were already reported at load time)
+        if formula is None or not formula.names <= params.keys():
+            return 0.0
 
+        try:
+            return float(formula(params))
         except Exception as e:
-            print(f"[WARN] Error evaluating formula '{formula}' with params {params}: {e}")
+            logger.warning(f"Error evaluating formula '{formula.source}' with params {params}: {e}")
             return 0.0
 
     # --------------------------------------------------------------
     # MATERIAL COMPUTATION
     # --------------------------------------------------------------
-    def compute_materials(self, materials_spec, params) -> Dict[str, float]:
+    def compute_compiled(self, compiled_materials, params) -> Dict[str, float]:
         results = {}
 
-        for item in materials_spec:
-            code = item["code"]
-            formula = item.get("qty_formula", "0")
-
-            qty = self._eval_formula(formula, params)
-            results[code] = round(qty, 4)
+        for code, formula in compiled_materials:
+            results[code] = round(self._eval_compiled(formula, params), 4)
 
         return results
 
@@ -83,11 +88,112 @@ class QuantityEstimator:
         context.update(rule.get("defaults", {}))
         context.update(params or {})
 
-        materials = rule.get("materials", [])
-        results = self.compute_materials(materials, context)
+        results = self.compute_compiled(self.rules[intervention_type].materials, context)
 
         return {
             "intervention_type": intervention_type,
             "params_used": context,
             "materials": results
         }
+
+    # --------------------------------------------------------------
+    # BATCH ENTRY POINTS
+    # --------------------------------------------------------------
+    def estimate_matrix(self, intervention_type: str, columns: Dict[str, Any],
+                        n: int = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Columnar form of estimate() for many interventions of one type.
+
+        columns: param name -> array of length n (or a scalar, broadcast);
+                 rule defaults fill params that are not given.
+        Returns (material codes, unrounded quantity matrix of shape (n, codes)).
+
+        Each formula is evaluated once over the columns with NumPy; rows the
+        vectorized form cannot reproduce (e.g. a division by zero) are
+        evaluated with the scalar path, so values match estimate().
+        """
+        rule = self.rules[intervention_type]
+        if n is None:
+            n = max((np.size(v) for v in columns.values()), default=1)
+
+        names = set()
+        for _, formula in rule.materials:
+            if formula is not None:
+                names |= formula.names
+
+        env = {}
+        for name in names:
+            if name in columns:
+                value = columns[name]
+            elif name in rule.defaults:
+                value = rule.defaults[name]
+            else:
+                continue
+            env[name] = np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))
+
+        codes = [code for code, _ in rule.materials]
+        matrix = np.zeros((n, len(codes)))
+
+        for j, (code, formula) in enumerate(rule.materials):
+            if formula is None or not formula.names <= env.keys():
+                continue
+
+            values, ok = formula.evaluate_columns(env, n)
+            matrix[:, j] = values
+            for i in np.flatnonzero(~ok):
+                row = {name: env[name][i].item() for name in formula.names}
+                matrix[i, j] = self._eval_compiled(formula, row)
+
+        return codes, matrix
+
+    def estimate_batch(self, intervention_type: str, params_list: List[dict]) -> List[Dict[str, Any]]:
+        """
+        Same result as [estimate(intervention_type, p) for p in params_list],
+        computed column-wise with estimate_matrix. Rows are grouped by the
+        set of params they carry (a missing param must still zero only the
+        formulas that use it). Rows where a param the formulas read is not
+        a plain int / float (strings, None, bools, ...) use the scalar path:
+        a float64 column would coerce "5" to 5.0 and None to NaN.
+        """
+        if intervention_type not in self.rulebook:
+            return [self.estimate(intervention_type, p) for p in params_list]
+
+        defaults = self.rulebook[intervention_type].get("defaults", {})
+        contexts = []
+        for params in params_list:
+            context = {}
+            context.update(defaults)
+            context.update(params or {})
+            contexts.append(context)
+
+        needed = set()
+        for _, formula in self.rules[intervention_type].materials:
+            if formula is not None:
+                needed |= formula.names
+
+        results: List[Dict[str, Any]] = [None] * len(contexts)
+        groups: Dict[frozenset, List[int]] = {}
+        for i, context in enumerate(contexts):
+            if all(_is_plain_number(context[name]) for name in needed if name in context):
+                groups.setdefault(frozenset(context), []).append(i)
+            else:
+                results[i] = self.estimate(intervention_type, params_list[i])
+
+        for keys, rows in groups.items():
+            # Defaults are merged into every context, so the columns hold
+            # exactly the params this group carries
+            columns = {
+                name: np.array([contexts[i][name] for i in rows], dtype=np.float64)
+                for name in keys & needed
+            }
+
+            codes, matrix = self.estimate_matrix(intervention_type, columns, n=len(rows))
+
+            for r, i in enumerate(rows):
+                results[i] = {
+                    "intervention_type": intervention_type,
+                    "params_used": contexts[i],
+                    "materials": {code: round(float(matrix[r, j]), 4) for j, code in enumerate(codes)}
+                }
+
+        return results
@@ -0,0 +1,235 @@
+# backend/services/rule_formulas.py
+"""
+Rule Formulas
+-------------
+Compiles the qty_formula strings in rulebook.json once, at load time.
+
+Each formula is parsed with ast, checked against a whitelist (arithmetic,
+comparisons, a few builtins and math.*), compiled to a code object, and
+its free variables are recorded. A formula that uses a name no rule
+supplies (defaults or input_params) is reported when the rulebook is
+compiled instead of failing on every request.
+
+Formulas built from arithmetic, the whitelisted builtins and math.* can
+also be evaluated over NumPy parameter columns (evaluate_columns) for
+batch estimation.
+"""
+
+import ast
+import functools
+import logging
+import math
+import types
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("services.rule_formulas")
+
+
+class FormulaError(ValueError):
+    pass
+
+
+# Names a formula may call, and the math attributes it may use
+FUNCTIONS = {
+    "int": int,
+    "round": round,
+    "max": max,
+    "min": min,
+    "float": float,
+    "abs": abs,
+}
+MATH_ATTRS = {"pi", "e", "ceil", "floor", "sqrt", "exp", "log", "log10", "sin", "cos", "tan", "hypot", "pow"}
+
+EVAL_GLOBALS = {"__builtins__": {}, "math": math, **FUNCTIONS}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.Call, ast.Name, ast.Load, ast.Attribute, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+# ---------------------------------------------------------
+# NUMPY EVALUATION
+# ---------------------------------------------------------
+# The same code objects are evaluated against NumPy stand-ins for the
+# builtins and math.*, with float64 parameter columns as locals. Anything
+# without an exact elementwise equivalent raises, and the caller falls
+# back to scalar evaluation.
+class _NotVectorized(Exception):
+    pass
+
+
+def _np_max(*args):
+    return functools.reduce(np.maximum, args)
+
+
+def _np_min(*args):
+    return functools.reduce(np.minimum, args)
+
+
+def _np_round(x, *ndigits):
+    # round(x) is half-to-even, like np.round; round(x, n) is not reproduced exactly
+    if ndigits:
+        raise _NotVectorized("round() with ndigits")
+    return np.round(x)
+
+
+def _np_log(x, *base):
+    if base:
+        raise _NotVectorized("math.log() with base")
+    return np.log(x)
+
+
+_NUMPY_MATH = types.SimpleNamespace(
+    pi=math.pi, e=math.e,
+    ceil=np.ceil, floor=np.floor, sqrt=np.sqrt, exp=np.exp, log=_np_log, log10=np.log10,
+    sin=np.sin, cos=np.cos, tan=np.tan, hypot=np.hypot, pow=np.power,
+)
+
+NUMPY_GLOBALS = {
+    "__builtins__": {},
+    "math": _NUMPY_MATH,
+    "int": np.trunc,
+    "round": _np_round,
+    "max": _np_max,
+    "min": _np_min,
+    "float": lambda x: np.asarray(x, dtype=np.float64),
+    "abs": np.abs,
+}
+
+# Nodes with short-circuit / truth-value semantics have no elementwise form
+_SCALAR_ONLY_NODES = (ast.BoolOp, ast.Compare, ast.IfExp, ast.Not)
+
+
+class CompiledFormula(NamedTuple):
+    source: str
+    tree: ast.Expression
+    code: Any
+    names: FrozenSet[str]   # free variables (params) the formula reads
+    vectorizable: bool
+
+    def __call__(self, env: Dict[str, Any]) -> Any:
+        return eval(self.code, EVAL_GLOBALS, env)
+
+    def evaluate_columns(self, columns: Dict[str, np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluates the formula over float64 parameter columns of length n.
+        Returns (values, ok): rows where ok is False (non-finite results,
+        e.g. a division by zero that raises in Python) must be evaluated
+        with the scalar path. If the formula cannot be vectorized at all,
+        every row is returned as not ok.
+        """
+        if not self.vectorizable:
+            return np.zeros(n), np.zeros(n, dtype=bool)
+
+        try:
+            with np.errstate(all="ignore"):
+                values = eval(self.code, NUMPY_GLOBALS, columns)
+            values = np.broadcast_to(np.asarray(values, dtype=np.float64), (n,))
+        except (_NotVectorized, TypeError, ValueError, ArithmeticError):
+            return np.zeros(n), np.zeros(n, dtype=bool)
+
+        return values, np.isfinite(values)
+
+
+def _validate(tree: ast.Expression, source: str) -> FrozenSet[str]:
+    names = set()
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise FormulaError(f"Disallowed syntax {type(node).__name__} in formula '{source}'")
+
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, bool)):
+            raise FormulaError(f"Disallowed constant {node.value!r} in formula '{source}'")
+
+        if isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == "math" and node.attr in MATH_ATTRS):
+                raise FormulaError(f"Disallowed attribute in formula '{source}'")
+
+        elif isinstance(node, ast.Call):
+            if node.keywords:
+                raise FormulaError(f"Keyword arguments are not allowed in formula '{source}'")
+            func = node.func
+            if not ((isinstance(func, ast.Name) and func.id in FUNCTIONS) or isinstance(func, ast.Attribute)):
+                raise FormulaError(f"Disallowed call in formula '{source}'")
+
+        elif isinstance(node, ast.Name):
+            if node.id not in FUNCTIONS and node.id != "math":
+                names.add(node.id)
+
+    return frozenset(names)
+
+
+def compile_formula(source: str) -> CompiledFormula:
+    try:
+        tree = ast.parse(str(source).strip(), mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula '{source}': {e.msg}") from None
+
+    names = _validate(tree, source)
+    code = compile(tree, "<qty_formula>", "eval")
+    vectorizable = not any(isinstance(node, _SCALAR_ONLY_NODES) for node in ast.walk(tree))
+    return CompiledFormula(source, tree, code, names, vectorizable)
+
+
+# ---------------------------------------------------------
+# RULEBOOK
+# ---------------------------------------------------------
+class CompiledRule(NamedTuple):
+    intervention_type: str
+    defaults: Dict[str, Any]
+    # (material code, formula); formula is None when it failed to compile
+    materials: List[Tuple[str, Any]]
+    # material code -> params the formula needs that the rule does not declare
+    missing: Dict[str, FrozenSet[str]]
+
+
+def compile_rule(intervention_type: str, rule: Dict[str, Any]) -> Tuple[CompiledRule, List[str]]:
+    defaults = dict(rule.get("defaults", {}))
+    declared = set(defaults) | set(rule.get("input_params", []))
+
+    materials = []
+    missing = {}
+    problems = []
+
+    for item in rule.get("materials", []):
+        code = item["code"]
+        try:
+            formula = compile_formula(item.get("qty_formula", "0"))
+        except FormulaError as e:
+            problems.append(f"{intervention_type}.{code}: {e}")
+            materials.append((code, None))
+            continue
+
+        undeclared = formula.names - declared
+        if undeclared:
+            missing[code] = undeclared
+            problems.append(
+                f"{intervention_type}.{code}: formula '{formula.source}' uses undeclared params {sorted(undeclared)}"
+            )
+        materials.append((code, formula))
+
+    return CompiledRule(intervention_type, defaults, materials, missing), problems
+
+
+def compile_rulebook(rulebook: Dict[str, Any]) -> Tuple[Dict[str, CompiledRule], List[str]]:
+    """
+    Compiles every rule. Returns ({type: CompiledRule}, problems) and logs
+    each problem (invalid formula, undeclared parameter) once.
+    """
+    compiled = {}
+    problems = []
+
+    for intervention_type, rule in rulebook.items():
+        compiled[intervention_type], rule_problems = compile_rule(intervention_type, rule)
+        problems.extend(rule_problems)
+
+    for p in problems:
+        logger.warning(f"Rulebook: {p}")
+
+    return compiled, problems
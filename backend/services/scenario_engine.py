@@ -0,0 +1,350 @@
+# backend/services/scenario_engine.py
+"""
+Scenario Engine
+---------------
+What-if re-costing of a processed report.
+
+A ScenarioSession runs classification and quantity estimation once and
+keeps, per intervention type, the parameter columns of its interventions
+(params_used from the quantity stage). A sweep then re-evaluates any
+number of scenarios against it:
+
+    {"name": "studs 6m, 2024 SOR",
+     "overrides": {"ROAD_STUDS": {"spacing_m": 6}, "ROAD_MARKING": {"width_mm": 200}},
+     "catalog": "2024/roads"}
+
+For each type, the scenarios are stacked into one set of columns
+(n interventions x S scenarios rows) and every rulebook formula is
+evaluated once over them (QuantityEstimator.estimate_matrix); costs are
+a multiply-add per material against the per-catalog SOR rate vectors.
+SOR rates are matched once per (session, catalog) and reused by every
+later sweep.
+
+Overrides replace the params a formula reads (spacing_m, width_mm,
+count, ...); params prepare_params derives from the chainage (area_m2
+of a pothole) are not re-derived. Totals follow /api/process-all:
+quantities rounded to 4 places, each intervention's total to 2.
+"""
+
+import itertools
+import math
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.cost_engine import load_installation_costs, material_unit, price_materials
+from services.estimation_service import EstimationService
+from services.process_pipeline import classify_stage, quantity_stage
+from services.sor_registry import CatalogKey, CatalogSelector, get_registry, resolve_catalog
+
+# Sessions kept in memory (least recently used are dropped)
+MAX_SESSIONS = int(os.environ.get("SCENARIO_SESSIONS", 16))
+# Upper bound on scenarios per sweep (a grid multiplies quickly)
+MAX_SCENARIOS = int(os.environ.get("SCENARIO_MAX_SCENARIOS", 1000))
+
+_SESSIONS: "OrderedDict[str, ScenarioSession]" = OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+class ScenarioGroup:
+    """Interventions of one type that carry the same param names."""
+
+    def __init__(self, intervention_type: str, params_list: List[Dict[str, Any]]):
+        self.intervention_type = intervention_type
+        self.n = len(params_list)
+        self.param_names = frozenset(params_list[0])
+        self.columns = {
+            name: np.array([params[name] for params in params_list], dtype=np.float64)
+            for name in self.param_names
+        }
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    # Python's round(), elementwise: np.round scales by 10**ndigits and
+    # can break half-paisa ties differently from the cost engine
+    return np.array([round(v, ndigits) for v in values.ravel().tolist()]).reshape(values.shape)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _check_selector(selector: Any) -> CatalogSelector:
+    # Sweep input is JSON: a catalog is a "year/category" style string or
+    # a list of its parts
+    if selector is None or isinstance(selector, (str, CatalogKey)):
+        return selector
+    if (isinstance(selector, (list, tuple)) and len(selector) in (2, 3)
+            and all(isinstance(part, str) for part in selector)):
+        return tuple(selector) if len(selector) == 3 else "/".join(selector)
+    raise ValueError(f"Invalid SOR catalog selector: {selector!r}")
+
+
+def _check_catalog(selector: CatalogSelector) -> CatalogKey:
+    # Raises ValueError / FileNotFoundError for unknown catalogs
+    key = resolve_catalog(_check_selector(selector))
+    get_registry().csv_path(key)
+    return key
+
+
+class ScenarioSession:
+
+    def __init__(self, estimator: EstimationService, interventions: List[Dict[str, Any]],
+                 catalog: CatalogSelector = None):
+        self.estimator = estimator
+        self.catalog = _check_catalog(catalog)
+        self.count = len(interventions)
+
+        records = quantity_stage(estimator, classify_stage(estimator, interventions))
+        self.failed = sum(1 for record in records if "failure" in record)
+
+        grouped: Dict[Tuple[str, frozenset], List[Dict[str, Any]]] = {}
+        for record in records:
+            if "failure" in record:
+                continue
+            est = record["estimate"]
+            intervention_type = est.get("intervention_type")
+            if intervention_type not in estimator.qe.rules:
+                continue
+            params = est.get("params_used", {})
+            grouped.setdefault((intervention_type, frozenset(params)), []).append(params)
+
+        self.groups = []
+        for (intervention_type, _), params_list in grouped.items():
+            try:
+                self.groups.append(ScenarioGroup(intervention_type, params_list))
+            except (TypeError, ValueError):
+                # Non-numeric params cannot be swept
+                self.failed += len(params_list)
+
+        self.types = sorted({group.intervention_type for group in self.groups})
+
+        installation_map = load_installation_costs()
+        self._installation = {}
+        for intervention_type in self.types:
+            row = installation_map.get(intervention_type.strip().upper())
+            self._installation[intervention_type] = float(row["rate"]) if row else 0.0
+
+        self._material_keys = list(dict.fromkeys(
+            (code, material_unit(code))
+            for group in self.groups
+            for code, _ in estimator.qe.rules[group.intervention_type].materials
+        ))
+        self._rates: Dict[CatalogKey, Dict[Tuple[str, Optional[str]], float]] = {}
+        self._rates_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # SOR RATES
+    # ------------------------------------------------------------------
+    def rates(self, catalog: CatalogKey) -> Dict[Tuple[str, Optional[str]], float]:
+        """(material, unit) -> SOR rate (0.0 when unmatched), matched once per catalog."""
+        with self._rates_lock:
+            if catalog in self._rates:
+                return self._rates[catalog]
+
+        best_matches = price_materials(self._material_keys, catalog=catalog)
+        rates = {key: float((best or {}).get("rate") or 0.0) for key, best in best_matches.items()}
+
+        with self._rates_lock:
+            self._rates[catalog] = rates
+        return rates
+
+    # ------------------------------------------------------------------
+    # SWEEP
+    # ------------------------------------------------------------------
+    def _group_totals(self, group: ScenarioGroup, scenarios: List[Dict[str, Any]],
+                      rate_tables: List[Dict[Tuple[str, Optional[str]], float]]) -> np.ndarray:
+        """Per-intervention totals of one group under every scenario, shape (S, n)."""
+        n, s = group.n, len(scenarios)
+
+        columns = {name: np.tile(column, s) for name, column in group.columns.items()}
+        for i, scenario in enumerate(scenarios):
+            for name, value in scenario["overrides"].get(group.intervention_type, {}).items():
+                if name not in columns:
+                    columns[name] = np.broadcast_to(
+                        np.asarray(self.estimator.qe.rules[group.intervention_type].defaults.get(name, 0), dtype=np.float64),
+                        (n * s,)
+                    ).copy()
+                columns[name][i * n:(i + 1) * n] = value
+
+        codes, matrix = self.estimator.qe.estimate_matrix(group.intervention_type, columns, n=n * s)
+        quantities = _round(matrix, 4).reshape(s, n, len(codes))
+
+        rates = np.array([
+            [table.get((code, material_unit(code)), 0.0) for code in codes]
+            for table in rate_tables
+        ]).reshape(s, len(codes))
+
+        # Accumulated material by material, in the order build_cost_breakdown
+        # sums them, so half-paisa ties round the same way
+        totals = np.zeros((s, n))
+        for j in range(len(codes)):
+            totals += quantities[:, :, j] * rates[:, j:j + 1]
+        totals += self._installation[group.intervention_type]
+        return _round(totals, 2)
+
+    def sweep(self, scenarios: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        scenarios: normalized scenarios (see normalize_scenarios).
+        Returns, per scenario, its grand total and totals by intervention type.
+        Raises ValueError when an override drives a total out of float range.
+        """
+        rate_tables = [self.rates(scenario["catalog"]) for scenario in scenarios]
+
+        by_type = np.zeros((len(scenarios), len(self.types)))
+        type_index = {t: j for j, t in enumerate(self.types)}
+        for group in self.groups:
+            totals = self._group_totals(group, scenarios, rate_tables)
+            by_type[:, type_index[group.intervention_type]] += totals.sum(axis=1)
+
+        with np.errstate(over="ignore"):
+            finite = np.isfinite(by_type).all(axis=1) & np.isfinite(by_type.sum(axis=1))
+        if not finite.all():
+            name = scenarios[int(np.flatnonzero(~finite)[0])]["name"]
+            raise ValueError(f"Scenario {name!r} produces a non-finite total; check its overrides")
+
+        return [
+            {
+                "name": scenario["name"],
+                "catalog": str(scenario["catalog"]),
+                "overrides": scenario["overrides"],
+                "grand_total": round(float(row.sum()), 2),
+                "by_type": {t: round(float(v), 2) for t, v in zip(self.types, row)},
+            }
+            for scenario, row in zip(scenarios, by_type)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "interventions": self.count,
+            "failed": self.failed,
+            "catalog": str(self.catalog),
+            "types": {
+                t: sum(group.n for group in self.groups if group.intervention_type == t)
+                for t in self.types
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # SCENARIO SPECS
+    # ------------------------------------------------------------------
+    def normalize_scenarios(self, scenarios: Optional[List[Dict[str, Any]]] = None,
+                            grid: Optional[Dict[str, List[Any]]] = None,
+                            catalogs: Optional[List[CatalogSelector]] = None) -> List[Dict[str, Any]]:
+        """
+        Builds the scenario list of a sweep from explicit scenarios
+        ([{"name", "overrides", "catalog"}]) and/or a grid:
+
+            grid:     {"ROAD_STUDS.spacing_m": [6, 8, 10], "ROAD_MARKING.width_mm": [150, 200]}
+            catalogs: ["2023/roads", "2024/roads"]
+
+        The grid expands to the cartesian product of its values and the
+        catalogs (default: the session catalog). Raises ValueError for
+        unknown types, non-numeric or non-finite values, malformed
+        catalogs or too many scenarios.
+        """
+        result = []
+
+        for i, scenario in enumerate(scenarios or []):
+            if not isinstance(scenario, dict):
+                raise ValueError(f"Scenario {i + 1} must be an object")
+            catalog = scenario.get("catalog")
+            name = scenario.get("name")
+            result.append(self._scenario(
+                str(name) if name is not None else f"scenario-{i + 1}",
+                scenario.get("overrides") or {},
+                self.catalog if catalog is None else catalog,
+            ))
+
+        if grid or catalogs:
+            axes = []
+            for path, values in (grid or {}).items():
+                intervention_type, _, name = path.partition(".")
+                if not name:
+                    raise ValueError(f"Grid keys are TYPE.param, got {path!r}")
+                if not isinstance(values, list):
+                    raise ValueError(f"Grid values for {path} must be a list")
+                bad = [v for v in values if not _is_number(v)]
+                if bad:
+                    raise ValueError(f"Grid values for {path} must be finite numbers, got {bad[0]!r}")
+                axes.append([(intervention_type, name, value) for value in values])
+
+            catalog_axis = catalogs or [self.catalog]
+            total = len(catalog_axis)
+            for axis in axes:
+                total *= len(axis)
+            if len(result) + total > MAX_SCENARIOS:
+                raise ValueError(f"Sweep has {len(result) + total} scenarios, limit is {MAX_SCENARIOS}")
+
+            for catalog in catalog_axis:
+                for combo in itertools.product(*axes):
+                    overrides: Dict[str, Dict[str, Any]] = {}
+                    for intervention_type, name, value in combo:
+                        overrides.setdefault(intervention_type, {})[name] = value
+                    label = ", ".join(f"{t}.{p}={v}" for t, p, v in combo)
+                    catalog_key = _check_catalog(catalog)
+                    name = f"{label} @ {catalog_key}" if label else str(catalog_key)
+                    result.append(self._scenario(name, overrides, catalog_key))
+
+        if len(result) > MAX_SCENARIOS:
+            raise ValueError(f"Sweep has {len(result)} scenarios, limit is {MAX_SCENARIOS}")
+        return result
+
+    def _scenario(self, name: str, overrides: Dict[str, Dict[str, Any]],
+                  catalog: CatalogSelector) -> Dict[str, Any]:
+        if not isinstance(overrides, dict):
+            raise ValueError("Scenario overrides must be an object of {TYPE: {param: value}}")
+
+        clean = {}
+        for intervention_type, params in overrides.items():
+            if intervention_type not in self.estimator.qe.rules:
+                raise ValueError(f"Unknown intervention type in overrides: {intervention_type}")
+            if not isinstance(params, dict):
+                raise ValueError(f"Overrides for {intervention_type} must be an object of params")
+
+            names = set()
+            for _, formula in self.estimator.qe.rules[intervention_type].materials:
+                if formula is not None:
+                    names |= formula.names
+
+            clean[intervention_type] = {}
+            for param, value in params.items():
+                if param not in names:
+                    raise ValueError(f"{intervention_type} formulas do not use param {param!r}")
+                if not _is_number(value):
+                    raise ValueError(f"Override {intervention_type}.{param} must be a finite number")
+                clean[intervention_type][param] = value
+
+        return {"name": name, "overrides": clean, "catalog": _check_catalog(catalog)}
+
+
+# ---------------------------------------------------------
+# SESSION STORE
+# ---------------------------------------------------------
+def create_session(estimator: EstimationService, interventions: List[Dict[str, Any]],
+                   catalog: CatalogSelector = None) -> Tuple[str, ScenarioSession]:
+    session = ScenarioSession(estimator, interventions, catalog)
+    session_id = uuid.uuid4().hex
+
+    with _SESSIONS_LOCK:
+        _SESSIONS[session_id] = session
+        while len(_SESSIONS) > MAX_SESSIONS:
+            _SESSIONS.popitem(last=False)
+    return session_id, session
+
+
+def get_session(session_id: str) -> Optional[ScenarioSession]:
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(session_id)
+        if session is not None:
+            _SESSIONS.move_to_end(session_id)
+        return session
+
+
+def drop_session(session_id: str) -> bool:
+    with _SESSIONS_LOCK:
+        return _SESSIONS.pop(session_id, None) is not None
@@ -0,0 +1,109 @@
+"""
+SOR Blocking Index
+------------------
+Character-trigram inverted index over normalized SOR descriptions.
+
+Used by SORMatcher to cut a large catalog down to a small candidate set
+before the rapidfuzz + unit_score ranking. Each posting list is a column
+of a sparse rows x trigrams matrix, so a query only touches the postings
+of its own trigrams.
+
+Recall guard: candidates() returns None, and the caller does a full
+scan, when
+  - min_candidates: fewer rows than this share any trigram with the
+    query, or
+  - min_coverage: no row contains at least this share of the query's
+    trigrams. Queries without a row that (nearly) contains them are the
+    weak ones, e.g. bare material codes; their best fuzzy match can be a
+    row with little trigram overlap, so they keep the exact full-scan
+    result.
+
+Calibrated on the 2023 catalog plus 8.6k distinct filler rows (10k rows):
+with min_coverage 0.9 blocking served 106 of 135 queries (catalog
+descriptions and free-text materials) with the full scan's best match;
+every rulebook material code except THERMOPLASTIC_PAINT_kg was scanned
+in full.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+__all__ = ["BlockingIndex", "trigrams"]
+
+# Catalogs smaller than this are always scanned in full
+MIN_ROWS = int(os.environ.get("SOR_BLOCKING_MIN_ROWS", 5000))
+MAX_CANDIDATES = int(os.environ.get("SOR_BLOCKING_MAX_CANDIDATES", 256))
+MIN_CANDIDATES = int(os.environ.get("SOR_BLOCKING_MIN_CANDIDATES", 32))
+MIN_COVERAGE = float(os.environ.get("SOR_BLOCKING_MIN_COVERAGE", 0.9))
+
+
+def trigrams(text: str) -> set:
+    grams = set()
+    for token in text.split():
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class BlockingIndex:
+
+    def __init__(
+        self,
+        normalized: Sequence[str],
+        max_candidates: int = MAX_CANDIDATES,
+        min_candidates: int = MIN_CANDIDATES,
+        min_coverage: float = MIN_COVERAGE,
+    ):
+        self.max_candidates = max_candidates
+        self.min_candidates = min_candidates
+        self.min_coverage = min_coverage
+        self.vocab: Dict[str, int] = {}
+
+        rows, cols = [], []
+        for row, text in enumerate(normalized):
+            for gram in trigrams(text):
+                col = self.vocab.setdefault(gram, len(self.vocab))
+                rows.append(row)
+                cols.append(col)
+
+        self.row_count = len(normalized)
+        self.row_sizes = np.bincount(np.asarray(rows, dtype=np.int64), minlength=self.row_count)
+        self.postings = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(self.row_count, max(len(self.vocab), 1)),
+        )
+
+    def candidates(self, query: str) -> Optional[np.ndarray]:
+        """
+        Returns sorted row ids worth scoring for ``query``, or None when the
+        recall guard asks for a full scan.
+        """
+        grams = trigrams(query)
+        cols = [self.vocab[g] for g in grams if g in self.vocab]
+        if not cols:
+            return None
+
+        overlap = np.asarray(self.postings[:, cols].sum(axis=1)).ravel()
+        hits = np.flatnonzero(overlap)
+
+        if len(hits) < self.min_candidates or overlap.max() < self.min_coverage * len(grams):
+            return None
+
+        if len(hits) > self.max_candidates:
+            # Overlap coefficient: token_set_ratio rewards a row whose tokens
+            # are (nearly) a subset of the query's or vice versa, so short
+            # rows must not lose to long rows that share more trigrams
+            sizes = np.minimum(self.row_sizes[hits], len(cols))
+            coverage = overlap[hits] / np.maximum(sizes, 1)
+            # Stable sort keeps earlier rows on ties (matches full-scan order)
+            top = np.argsort(-coverage, kind="stable")[:self.max_candidates]
+            hits = hits[top]
+
+        return np.sort(hits)
+
+    def candidates_batch(self, queries: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.candidates(q) for q in queries]
@@ -0,0 +1,221 @@
+"""
+Compiled SOR Catalog
+--------------------
+Memory-mappable on-disk form of a SOR CSV, so workers skip the pandas
+parse and share the catalog pages through the OS page cache.
+
+Layout (one directory per SOR file, e.g. data/sor_compiled/2023/roads/):
+
+    rates.npy          float64[n]   unit rate, NaN when the row has none
+    unit_ids.npy       int32[n]     index into units.json
+    units.json                      distinct lower-cased unit strings
+    desc.bin           utf-8 bytes  raw descriptions, concatenated
+    desc_offsets.npy   int64[n+1]   row i is desc.bin[off[i]:off[i+1]]
+    norm.bin           utf-8 bytes  normalize(description), concatenated
+    norm_offsets.npy   int64[n+1]
+    meta.json                       row count, format version, CSV SHA-256
+
+meta.json is written last and is what marks a catalog as complete.
+
+Build with:
+
+    python -m services.sor_catalog                      # default SOR CSV
+    python -m services.sor_catalog --sor data/sor_csv/2023/roads.csv
+"""
+
+import argparse
+import json
+import logging
+import os
+from typing import Optional, Iterator
+
+import numpy as np
+
+from services.sor_match_table import catalog_relpath, file_sha256
+
+__all__ = ["StringTable", "CompiledCatalog", "compile_catalog", "load_compiled_catalog", "catalog_dir_for"]
+
+logger = logging.getLogger("services.sor_catalog")
+
+COMPILED_DIR = os.path.join("data", "sor_compiled")
+FORMAT_VERSION = 1
+
+
+def catalog_dir_for(sor_csv_path: str) -> str:
+    """
+    data/sor_csv/2023/roads.csv        -> data/sor_compiled/2023/roads
+    data/sor_csv/kerala/2024/roads.csv -> data/sor_compiled/kerala/2024/roads
+    """
+    return os.path.join(COMPILED_DIR, catalog_relpath(sor_csv_path))
+
+
+# --------------------------------------------------
+# STRING TABLE
+# --------------------------------------------------
+class StringTable:
+    """
+    Read-only sequence of strings stored as one utf-8 blob plus offsets.
+    Strings are decoded on access; nothing is copied at open time.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def open(cls, blob_path: str, offsets_path: str) -> "StringTable":
+        offsets = np.load(offsets_path, mmap_mode="r")
+        if os.path.getsize(blob_path):
+            blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.empty(0, dtype=np.uint8)
+        return cls(blob, offsets)
+
+    @staticmethod
+    def write(strings, blob_path: str, offsets_path: str):
+        offsets = [0]
+        with open(blob_path, "wb") as f:
+            for s in strings:
+                data = s.encode("utf-8")
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        _save_npy(offsets_path, np.array(offsets, dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        # One bytes copy of the blob for the pass, not one NumPy slice per row
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+
+def _save_npy(path: str, array: np.ndarray):
+    # np.save appends ".npy" to bare names, so write through a file handle
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+# --------------------------------------------------
+# COMPILED CATALOG
+# --------------------------------------------------
+class CompiledCatalog:
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "units.json"), "r", encoding="utf-8") as f:
+            self.unit_table = json.load(f)
+
+        self.rates = np.load(os.path.join(path, "rates.npy"), mmap_mode="r")
+        self.unit_ids = np.load(os.path.join(path, "unit_ids.npy"), mmap_mode="r")
+        self.descriptions = StringTable.open(
+            os.path.join(path, "desc.bin"), os.path.join(path, "desc_offsets.npy")
+        )
+        self.normalized = StringTable.open(
+            os.path.join(path, "norm.bin"), os.path.join(path, "norm_offsets.npy")
+        )
+
+        self.row_count = int(self.meta["row_count"])
+        if not (
+            len(self.rates) == len(self.unit_ids) == len(self.descriptions)
+            == len(self.normalized) == self.row_count
+        ):
+            raise ValueError(f"Compiled SOR catalog at {path} is inconsistent")
+
+    def units(self) -> np.ndarray:
+        """Per-row unit strings (object array)."""
+        table = np.array(self.unit_table, dtype=object)
+        return table[np.asarray(self.unit_ids)] if self.row_count else np.empty(0, dtype=object)
+
+
+def compile_catalog(sor_csv_path: Optional[str] = None, out_dir: Optional[str] = None) -> str:
+    from services.price_service import SOR_CSV_PATH, SORMatcher, read_sor_csv
+
+    sor_csv_path = sor_csv_path or SOR_CSV_PATH
+    out_dir = out_dir or catalog_dir_for(sor_csv_path)
+
+    # Same parse and column conversion as the live CSV path, so a compiled
+    # catalog cannot disagree with it on NA / blank / numeric-looking cells
+    matcher = SORMatcher.from_dataframe(read_sor_csv(sor_csv_path))
+    descriptions = matcher.descriptions
+    units = [str(u) for u in matcher.units]
+
+    unit_table = sorted(set(units))
+    unit_index = {u: i for i, u in enumerate(unit_table)}
+
+    os.makedirs(out_dir, exist_ok=True)
+    meta_path = os.path.join(out_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    _save_npy(os.path.join(out_dir, "rates.npy"), matcher.rates)
+    _save_npy(
+        os.path.join(out_dir, "unit_ids.npy"),
+        np.array([unit_index[u] for u in units], dtype=np.int32),
+    )
+    with open(os.path.join(out_dir, "units.json"), "w", encoding="utf-8") as f:
+        json.dump(unit_table, f)
+
+    StringTable.write(descriptions, os.path.join(out_dir, "desc.bin"), os.path.join(out_dir, "desc_offsets.npy"))
+    StringTable.write(
+        matcher.normalized,
+        os.path.join(out_dir, "norm.bin"),
+        os.path.join(out_dir, "norm_offsets.npy"),
+    )
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "sor_csv": sor_csv_path,
+            "sor_sha256": file_sha256(sor_csv_path),
+            "row_count": len(descriptions),
+        }, f, indent=2)
+
+    logger.info(f"Compiled {len(descriptions)} SOR rows to {out_dir}")
+    return out_dir
+
+
+def load_compiled_catalog(sor_csv_path: str) -> Optional[CompiledCatalog]:
+    """
+    Opens the compiled catalog for sor_csv_path, or returns None when it
+    has not been compiled, is incomplete, or is older than the CSV.
+    """
+    path = catalog_dir_for(sor_csv_path)
+    meta_path = os.path.join(path, "meta.json")
+
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        catalog = CompiledCatalog(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring compiled SOR catalog at {path}: {e}")
+        return None
+
+    if catalog.meta.get("format_version") != FORMAT_VERSION:
+        return None
+
+    if os.path.exists(sor_csv_path) and catalog.meta.get("sor_sha256") != file_sha256(sor_csv_path):
+        logger.warning(f"Ignoring stale compiled SOR catalog at {path}; rebuild with `python -m services.sor_catalog`")
+        return None
+
+    return catalog
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Compile a SOR CSV into the memory-mapped catalog format")
+    parser.add_argument("--sor", default=None, help="SOR CSV to compile (default: price_service.SOR_CSV_PATH)")
+    parser.add_argument("--out", default=None, help="Output directory (default: data/sor_compiled/<year>/<name>)")
+    args = parser.parse_args()
+
+    compile_catalog(args.sor, args.out)
@@ -0,0 +1,204 @@
+"""
+SOR Match Table
+---------------
+Materialized material-code -> SOR match table.
+
+Every material code the cost engine prices comes from the closed set in
+rulebook.json, so the fuzzy match against a SOR file can be done once,
+offline, and stored:
+
+    python -m services.sor_match_table                 # default SOR CSV
+    python -m services.sor_match_table --sor data/sor_csv/2023/roads.csv --top-n 5
+
+Each table records the SHA-256 of the rulebook and of the SOR CSV it was
+built from. load_match_table() ignores a table whose hashes no longer
+match the files on disk, so a stale table silently falls back to live
+matching instead of returning wrong rates.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Any, Optional
+
+__all__ = ["build_match_table", "load_match_table", "lookup_match", "table_path_for"]
+
+logger = logging.getLogger("services.sor_match_table")
+
+RULEBOOK_PATH = os.path.join("data", "rulebook.json")
+SOR_CSV_DIR = os.path.join("data", "sor_csv")
+TABLE_DIR = os.path.join("data", "sor_match")
+DEFAULT_TOP_N = 5
+
+# (sor_csv_path, rulebook sha256) -> loaded table (or None when missing / stale)
+_TABLES: Dict[tuple, Optional[Dict[str, Any]]] = {}
+
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def table_path_for(sor_csv_path: str) -> str:
+    """
+    data/sor_csv/2023/roads.csv        -> data/sor_match/2023/roads.json
+    data/sor_csv/kerala/2024/roads.csv -> data/sor_match/kerala/2024/roads.json
+    """
+    return os.path.join(TABLE_DIR, catalog_relpath(sor_csv_path) + ".json")
+
+
+def catalog_relpath(sor_csv_path: str) -> str:
+    """Path of a SOR CSV relative to data/sor_csv, without extension."""
+    rel = os.path.relpath(sor_csv_path, SOR_CSV_DIR)
+    if rel.startswith(os.pardir):
+        rel = os.path.join(
+            os.path.basename(os.path.dirname(sor_csv_path)), os.path.basename(sor_csv_path)
+        )
+    return os.path.splitext(rel)[0]
+
+
+def unit_from_code(code: str) -> Optional[str]:
+    # Same convention as cost_engine: unit is the last "_" segment
+    return code.split("_")[-1] if "_" in code else None
+
+
+def rulebook_material_codes(rulebook: Dict[str, Any]):
+    codes = set()
+    for rule in rulebook.values():
+        for item in rule.get("materials", []):
+            codes.add(item["code"])
+    return sorted(codes)
+
+
+# --------------------------------------------------
+# BUILD (OFFLINE)
+# --------------------------------------------------
+def build_match_table(
+    sor_csv_path: Optional[str] = None,
+    rulebook_path: str = RULEBOOK_PATH,
+    top_n: int = DEFAULT_TOP_N,
+    out_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    from services.price_service import SORMatcher, SOR_CSV_PATH, read_sor_csv
+
+    sor_csv_path = sor_csv_path or SOR_CSV_PATH
+    out_path = out_path or table_path_for(sor_csv_path)
+
+    with open(rulebook_path, "r", encoding="utf-8") as f:
+        rulebook = json.load(f)
+
+    codes = rulebook_material_codes(rulebook)
+    units = [unit_from_code(c) for c in codes]
+
+    matcher = SORMatcher.from_dataframe(read_sor_csv(sor_csv_path))
+    ranked = matcher.rank_batch(codes, units, top_n=top_n)
+
+    materials = {}
+    for code, unit, candidates in zip(codes, units, ranked):
+        best = candidates[0] if candidates else None
+        materials[code] = {
+            "unit": unit,
+            "rate": best["rate"] if best else None,
+            "best_match": best,
+            "candidates": candidates,
+        }
+
+    table = {
+        "version": {
+            "rulebook_sha256": file_sha256(rulebook_path),
+            "sor_sha256": file_sha256(sor_csv_path),
+            "top_n": top_n,
+        },
+        "sor_csv": sor_csv_path,
+        "built_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "materials": materials,
+    }
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp_path, out_path)
+
+    for key in [k for k in _TABLES if k[0] == sor_csv_path]:
+        _TABLES.pop(key, None)
+    logger.info(f"Wrote {len(materials)} material matches to {out_path}")
+    return table
+
+
+# --------------------------------------------------
+# LOAD (REQUEST TIME)
+# --------------------------------------------------
+def load_match_table(sor_csv_path: str, rulebook_path: str = RULEBOOK_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Returns the table for sor_csv_path, or None if it has not been built
+    or was built from a different rulebook / SOR file.
+    """
+    # The rulebook can be hot-reloaded (services/data_registry.py), so
+    # tables are cached per rulebook version
+    if rulebook_path == RULEBOOK_PATH:
+        from services.data_registry import get_dataset
+        rulebook_sha256 = get_dataset("rulebook").version
+    else:
+        rulebook_sha256 = file_sha256(rulebook_path) if os.path.exists(rulebook_path) else None
+
+    cache_key = (sor_csv_path, rulebook_sha256)
+    if cache_key in _TABLES:
+        return _TABLES[cache_key]
+
+    table = None
+    path = table_path_for(sor_csv_path)
+
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            candidate = json.load(f)
+
+        version = candidate.get("version", {})
+        if (
+            rulebook_sha256 is not None
+            and os.path.exists(sor_csv_path)
+            and version.get("rulebook_sha256") == rulebook_sha256
+            and version.get("sor_sha256") == file_sha256(sor_csv_path)
+        ):
+            table = candidate
+        else:
+            logger.warning(f"Ignoring stale SOR match table {path}; rebuild with `python -m services.sor_match_table`")
+
+    _TABLES[cache_key] = table
+    return table
+
+
+def lookup_match(sor_csv_path: str, material: str, unit: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the precomputed entry for (material, unit), or None on a miss.
+    """
+    table = load_match_table(sor_csv_path)
+    if not table:
+        return None
+
+    entry = table["materials"].get(material)
+    if not entry or entry.get("unit") != unit:
+        return None
+
+    return entry
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Build the material-code -> SOR match table")
+    parser.add_argument("--sor", default=None, help="SOR CSV to match against (default: price_service.SOR_CSV_PATH)")
+    parser.add_argument("--rulebook", default=RULEBOOK_PATH)
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    args = parser.parse_args()
+
+    build_match_table(args.sor, rulebook_path=args.rulebook, top_n=args.top_n)
@@ -0,0 +1,258 @@
+"""
+SOR Registry
+------------
+Serves several SOR catalogs at once, keyed by (source, year, category).
+
+Catalog files live under data/sor_csv/:
+
+    data/sor_csv/<source>/<year>/<category>.csv     e.g. kerala/2024/roads.csv
+    data/sor_csv/<year>/<category>.csv              legacy layout, source "cpwd"
+
+Catalog names are case-insensitive: keys are lower-cased and matched to
+directory and file names without regard to case.
+
+A catalog's matcher is built on first use (from its compiled catalog when
+available, see services/sor_catalog.py) and kept in an LRU. When the
+estimated size of the resident matchers exceeds the memory budget
+(SOR_REGISTRY_MEMORY_MB, default 256) the least recently used ones are
+evicted; the catalog in use is never evicted.
+
+Selectors accepted wherever a ``catalog`` argument is taken:
+    None                      -> DEFAULT_CATALOG
+    "2023/roads"              -> ("cpwd", 2023, "roads")
+    "kerala/2024/roads"       -> ("kerala", 2024, "roads")
+    ("kerala", 2024, "roads") or CatalogKey(...)
+    {"source": "kerala", "year": 2024, "category": "roads"}
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Union
+
+
+__all__ = ["CatalogKey", "SORRegistry", "DEFAULT_CATALOG", "resolve_catalog", "get_registry"]
+
+logger = logging.getLogger("services.sor_registry")
+
+SOR_CSV_DIR = os.path.join("data", "sor_csv")
+DEFAULT_SOURCE = "cpwd"
+DEFAULT_CATEGORY = "roads"
+DEFAULT_MEMORY_MB = 256
+
+
+class CatalogKey(NamedTuple):
+    source: str
+    year: int
+    category: str
+
+    def __str__(self) -> str:
+        return f"{self.source}/{self.year}/{self.category}"
+
+
+DEFAULT_CATALOG = CatalogKey(DEFAULT_SOURCE, 2023, DEFAULT_CATEGORY)
+
+CatalogSelector = Union[None, str, tuple, dict, CatalogKey]
+
+
+def _catalog_key(source: Any, year: Any, category: Any) -> CatalogKey:
+    # The one place catalog names are normalized: keys compare lower-cased,
+    # and csv_path matches them to files case-insensitively
+    return CatalogKey(str(source).strip().lower(), int(year), str(category).strip().lower())
+
+
+def resolve_catalog(selector: CatalogSelector = None) -> CatalogKey:
+    """
+    Normalizes a catalog selector to a CatalogKey. Raises ValueError for
+    selectors that cannot be parsed (existence is checked by the registry).
+    """
+    if selector is None or selector == "":
+        return DEFAULT_CATALOG
+
+    if isinstance(selector, dict):
+        parts = (
+            selector.get("source", DEFAULT_SOURCE),
+            selector.get("year", DEFAULT_CATALOG.year),
+            selector.get("category", DEFAULT_CATEGORY),
+        )
+    elif isinstance(selector, str):
+        parts = tuple(p for p in selector.strip("/").split("/") if p)
+        if len(parts) == 2:
+            parts = (DEFAULT_SOURCE,) + parts
+    elif isinstance(selector, (list, tuple)):
+        parts = tuple(selector)
+    else:
+        raise ValueError(f"Invalid SOR catalog selector: {selector!r}")
+
+    if len(parts) != 3:
+        raise ValueError(f"Invalid SOR catalog selector: {selector!r}")
+
+    source, year, category = parts
+    try:
+        return _catalog_key(source, year, category)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid SOR catalog year in selector: {selector!r}")
+
+
+def _find_path(root: str, *parts: str) -> Optional[str]:
+    """root/part/... matching each part case-insensitively (exact name first)."""
+    path = root
+    for part in parts:
+        exact = os.path.join(path, part)
+        if os.path.exists(exact):
+            path = exact
+            continue
+        try:
+            entries = sorted(os.listdir(path))
+        except OSError:
+            return None
+        match = next((e for e in entries if e.lower() == part.lower()), None)
+        if match is None:
+            return None
+        path = os.path.join(path, match)
+    return path
+
+
+class SORRegistry:
+
+    def __init__(self, root: str = SOR_CSV_DIR, memory_budget_bytes: Optional[int] = None):
+        if memory_budget_bytes is None:
+            memory_budget_bytes = int(os.environ.get("SOR_REGISTRY_MEMORY_MB", DEFAULT_MEMORY_MB)) * 1024 * 1024
+
+        self.root = root
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self._matchers: "OrderedDict[CatalogKey, Any]" = OrderedDict()
+        self._sizes: Dict[CatalogKey, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[CatalogKey, threading.Lock] = {}
+
+    # --------------------------------------------------
+    # CATALOG FILES
+    # --------------------------------------------------
+    def csv_path(self, key: CatalogSelector) -> str:
+        key = resolve_catalog(key)
+        path = _find_path(self.root, key.source, str(key.year), f"{key.category}.csv")
+        if path is not None:
+            return path
+
+        if key.source == DEFAULT_SOURCE:
+            legacy = _find_path(self.root, str(key.year), f"{key.category}.csv")
+            if legacy is not None:
+                return legacy
+
+        raise FileNotFoundError(f"No SOR catalog for {key} under {self.root}")
+
+    def available(self) -> List[CatalogKey]:
+        keys = []
+        if not os.path.isdir(self.root):
+            return keys
+
+        for entry in sorted(os.listdir(self.root)):
+            entry_path = os.path.join(self.root, entry)
+            if not os.path.isdir(entry_path):
+                continue
+
+            if entry.isdigit():
+                keys.extend(self._scan_year(DEFAULT_SOURCE, entry, entry_path))
+                continue
+
+            for year in sorted(os.listdir(entry_path)):
+                year_path = os.path.join(entry_path, year)
+                if year.isdigit() and os.path.isdir(year_path):
+                    keys.extend(self._scan_year(entry, year, year_path))
+
+        return keys
+
+    @staticmethod
+    def _scan_year(source: str, year: str, path: str) -> List[CatalogKey]:
+        return [
+            _catalog_key(source, year, os.path.splitext(f)[0])
+            for f in sorted(os.listdir(path))
+            if f.lower().endswith(".csv")
+        ]
+
+    # --------------------------------------------------
+    # MATCHERS
+    # --------------------------------------------------
+    def get_matcher(self, selector: CatalogSelector = None):
+        key = resolve_catalog(selector)
+
+        with self._lock:
+            matcher = self._matchers.get(key)
+            if matcher is not None:
+                self._matchers.move_to_end(key)
+                return matcher
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so other catalogs keep serving
+        with load_lock:
+            with self._lock:
+                matcher = self._matchers.get(key)
+                if matcher is not None:
+                    self._matchers.move_to_end(key)
+                    return matcher
+
+            matcher = self._load(key)
+
+            with self._lock:
+                self._matchers[key] = matcher
+                self._sizes[key] = matcher.memory_bytes()
+                self._evict(keep=key)
+
+        return matcher
+
+    def _load(self, key: CatalogKey):
+        from services.price_service import SORMatcher, read_sor_csv
+        from services.sor_catalog import load_compiled_catalog
+
+        csv_path = self.csv_path(key)
+        catalog = load_compiled_catalog(csv_path)
+
+        if catalog is not None:
+            matcher = SORMatcher.from_catalog(catalog)
+            logger.info(f"SOR catalog {key} loaded from {catalog.path} ({matcher.row_count} rows)")
+        else:
+            matcher = SORMatcher.from_dataframe(read_sor_csv(csv_path))
+            logger.info(f"SOR catalog {key} loaded from {csv_path} ({matcher.row_count} rows)")
+
+        # Build the blocking index (large catalogs only) now rather than on
+        # the first batch, so the size recorded for the memory budget counts it
+        matcher.blocking_index()
+        return matcher
+
+    def _evict(self, keep: CatalogKey):
+        while self.resident_bytes() > self.memory_budget_bytes and len(self._matchers) > 1:
+            key = next(k for k in self._matchers if k != keep)
+            del self._matchers[key]
+            self._sizes.pop(key, None)
+            logger.info(f"Evicted SOR catalog {key} (memory budget {self.memory_budget_bytes} bytes)")
+
+    def resident_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def loaded(self) -> List[CatalogKey]:
+        with self._lock:
+            return list(self._matchers)
+
+    def evict(self, selector: CatalogSelector = None):
+        key = resolve_catalog(selector)
+        with self._lock:
+            self._matchers.pop(key, None)
+            self._sizes.pop(key, None)
+
+
+_REGISTRY: Optional[SORRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> SORRegistry:
+    global _REGISTRY
+
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = SORRegistry()
+
+    return _REGISTRY
@@ -0,0 +1,241 @@
+# backend/services/startup_registry.py
+"""
+Startup Registry
+----------------
+The app imports no heavy module at startup: routers import the PDF
+reader, the pricing stack (pandas, rapidfuzz), the clause index
+(scikit-learn) and the Gemini client on first use, and the reference
+data is built lazily by services/data_registry.py. This module names
+those subsystems so their latency can be paid on our schedule instead:
+
+    rulebook            EstimationService (rulebook, formulas, classifier)
+    installation_costs  data/installation_costs.json
+    clauses             IRC clause matcher (TF-IDF index)
+    sor                 pricing stack + default SOR catalog matcher
+    pdf                 PyMuPDF extractor
+    gemini              Gemini chatbot client
+
+GET /ready reports each subsystem as cold / warming / warm / failed and
+answers 503 until the ones in READY_REQUIRES (comma-separated, default:
+WARMUP_ON_STARTUP) are warm. POST /warmup preloads the chosen ones in
+parallel threads. WARMUP_ON_STARTUP starts that warmup in the background
+when the app starts (default: none).
+
+Import budget check, for CI (exit status 1 when over budget or when a
+heavy module is imported by main):
+
+    python -m services.startup_registry --check-imports [--budget 1.5]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+STATUS_COLD = "cold"
+STATUS_WARMING = "warming"
+STATUS_WARM = "warm"
+STATUS_FAILED = "failed"
+
+# Seconds `import main` may take in a fresh interpreter
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", 1.5))
+# Modules that must not be imported by `import main`
+HEAVY_MODULES = (
+    "pandas", "rapidfuzz", "sklearn", "scipy", "fitz", "pymupdf",
+    "google.generativeai", "sentence_transformers", "faiss", "torch",
+)
+
+
+def _env_list(name: str, default: str = "") -> List[str]:
+    return [s.strip() for s in os.environ.get(name, default).split(",") if s.strip()]
+
+
+# ---------------------------------------------------------
+# SUBSYSTEMS
+# ---------------------------------------------------------
+class Subsystem(NamedTuple):
+    name: str
+    warm: Callable[[], Any]
+    # True when already loaded, e.g. by a request that needed it
+    is_warm: Callable[[], bool]
+
+
+def _dataset_loaded(name: str) -> bool:
+    from services.data_registry import get_data_registry
+    return get_data_registry().is_loaded(name)
+
+
+def _warm_dataset(name: str):
+    from services.data_registry import get_dataset
+    get_dataset(name)
+
+
+def _warm_sor():
+    importlib.import_module("services.process_pipeline")
+    from services.sor_registry import get_registry
+    get_registry().get_matcher()
+
+
+def _sor_loaded() -> bool:
+    from services.sor_registry import DEFAULT_CATALOG, get_registry
+    return DEFAULT_CATALOG in get_registry().loaded()
+
+
+def _module_subsystem(name: str, module: str) -> Subsystem:
+    return Subsystem(name, lambda: importlib.import_module(module), lambda: module in sys.modules)
+
+
+SUBSYSTEMS: Dict[str, Subsystem] = {
+    s.name: s for s in (
+        Subsystem("rulebook", lambda: _warm_dataset("rulebook"), lambda: _dataset_loaded("rulebook")),
+        Subsystem("installation_costs", lambda: _warm_dataset("installation_costs"),
+                  lambda: _dataset_loaded("installation_costs")),
+        Subsystem("clauses", lambda: _warm_dataset("irc_clauses"), lambda: _dataset_loaded("irc_clauses")),
+        Subsystem("sor", _warm_sor, _sor_loaded),
+        _module_subsystem("pdf", "core.extractor"),
+        _module_subsystem("gemini", "services.gemini_service"),
+    )
+}
+
+READY_REQUIRES = _env_list("READY_REQUIRES", os.environ.get("WARMUP_ON_STARTUP", ""))
+WARMUP_ON_STARTUP = _env_list("WARMUP_ON_STARTUP")
+
+# name -> {"status", "seconds", "error"} for subsystems warmed through this module
+_STATE: Dict[str, Dict[str, Any]] = {}
+_STATE_LOCK = threading.Lock()
+
+
+def _check_names(names: Optional[Iterable[str]]) -> List[str]:
+    if names is None:
+        return list(SUBSYSTEMS)
+    names = list(dict.fromkeys(names))
+    unknown = [n for n in names if n not in SUBSYSTEMS]
+    if unknown:
+        raise ValueError(f"Unknown subsystems: {unknown}; expected some of {list(SUBSYSTEMS)}")
+    return names
+
+
+def status(name: str) -> Dict[str, Any]:
+    with _STATE_LOCK:
+        state = dict(_STATE.get(name, {}))
+
+    if state.get("status") == STATUS_WARMING:
+        return state
+    try:
+        warm = SUBSYSTEMS[name].is_warm()
+    except Exception:
+        warm = False
+
+    if warm:
+        state["status"] = STATUS_WARM
+        state.pop("error", None)
+    elif state.get("status") != STATUS_FAILED:
+        state = {"status": STATUS_COLD}
+    return state
+
+
+def _warm_one(name: str) -> Dict[str, Any]:
+    with _STATE_LOCK:
+        if _STATE.get(name, {}).get("status") == STATUS_WARMING:
+            return dict(_STATE[name])
+        _STATE[name] = {"status": STATUS_WARMING}
+
+    started = time.perf_counter()
+    try:
+        SUBSYSTEMS[name].warm()
+        state = {"status": STATUS_WARM, "seconds": round(time.perf_counter() - started, 3)}
+    except Exception as e:
+        state = {"status": STATUS_FAILED, "seconds": round(time.perf_counter() - started, 3), "error": str(e)}
+
+    with _STATE_LOCK:
+        _STATE[name] = state
+    return dict(state)
+
+
+def warmup(names: Optional[Iterable[str]] = None, wait: bool = True) -> Dict[str, Dict[str, Any]]:
+    """
+    Loads the named subsystems (default: all) in parallel threads. With
+    wait=False returns immediately; poll readiness() for progress.
+    """
+    names = _check_names(names)
+    if not names:
+        return {}
+
+    pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="warmup")
+    futures = {name: pool.submit(_warm_one, name) for name in names}
+    pool.shutdown(wait=False)
+
+    if not wait:
+        return {name: status(name) for name in names}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def readiness(required: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    required = _check_names(READY_REQUIRES if required is None else required)
+    subsystems = {name: status(name) for name in SUBSYSTEMS}
+    return {
+        "ready": all(subsystems[name]["status"] == STATUS_WARM for name in required),
+        "requires": list(required),
+        "subsystems": subsystems,
+    }
+
+
+def warmup_on_startup():
+    if WARMUP_ON_STARTUP:
+        warmup(WARMUP_ON_STARTUP, wait=False)
+
+
+# ---------------------------------------------------------
+# IMPORT BUDGET
+# ---------------------------------------------------------
+_IMPORT_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - t, "modules": sorted(sys.modules)}))
+"""
+
+
+def check_imports(budget: float = IMPORT_BUDGET_SECONDS) -> List[str]:
+    """
+    Imports main in a fresh interpreter. Returns the problems found
+    (over budget, heavy modules imported); empty when within budget.
+    """
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=backend_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE], cwd=backend_dir, env=env,
+        capture_output=True, text=True, check=True
+    )
+    probe = json.loads(out.stdout.strip().splitlines()[-1])
+
+    problems = []
+    if probe["seconds"] > budget:
+        problems.append(f"import main took {probe['seconds']:.3f}s, budget is {budget:.3f}s")
+    modules = set(probe["modules"])
+    heavy = [m for m in HEAVY_MODULES if m in modules]
+    if heavy:
+        problems.append(f"import main loaded heavy modules: {heavy}")
+
+    print(f"import main: {probe['seconds']:.3f}s (budget {budget:.3f}s), {len(modules)} modules")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup checks")
+    parser.add_argument("--check-imports", action="store_true", help="check the import time budget of main")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS)
+    args = parser.parse_args()
+
+    if args.check_imports:
+        problems = check_imports(args.budget)
+        for p in problems:
+            print("FAIL:", p)
+        sys.exit(1 if problems else 0)
+    parser.print_help()
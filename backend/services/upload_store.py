@@ -0,0 +1,101 @@
+# backend/services/upload_store.py
+"""
+Upload Store
+------------
+Content-addressed storage for uploaded reports plus a cache of their
+extraction results.
+
+    uploads/<sha[:2]>/<sha256>.pdf              the uploaded file
+    data/extract_cache/<sha256>-v<version>.json  read_pdf + extract_interventions
+
+Uploads are streamed to disk in fixed-size chunks while the SHA-256 is
+computed, so memory stays flat regardless of file size. The cache key
+includes core.extractor.EXTRACTOR_VERSION so a parser change never
+serves stale results.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+
+UPLOAD_DIR = "uploads"
+EXTRACT_CACHE_DIR = os.path.join("data", "extract_cache")
+CHUNK_SIZE = 1024 * 1024
+
+
+def upload_path_for(sha256: str) -> str:
+    return os.path.join(UPLOAD_DIR, sha256[:2], f"{sha256}.pdf")
+
+
+async def save_upload(file) -> Tuple[str, str]:
+    """
+    Streams a FastAPI UploadFile to the content-addressed store.
+    Returns (sha256, path). Re-uploads of a known file reuse the stored copy.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = upload_path_for(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return sha256, path
+
+
+# ---------------------------------------------------------
+# EXTRACTION CACHE
+# ---------------------------------------------------------
+def _cache_path(sha256: str) -> str:
+    # Imported here so the upload routes do not load PyMuPDF at startup
+    from core.extractor import EXTRACTOR_VERSION
+    return os.path.join(EXTRACT_CACHE_DIR, f"{sha256}-v{EXTRACTOR_VERSION}.json")
+
+
+def load_cached_extraction(sha256: str) -> Optional[Dict[str, Any]]:
+    path = _cache_path(sha256)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_extraction(sha256: str, result: Dict[str, Any]):
+    """Writes the cache entry atomically (temp file + rename)."""
+    os.makedirs(EXTRACT_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=EXTRACT_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, _cache_path(sha256))
+
+
+def extraction_response(filename: str, sha256: str, interventions, cached: bool) -> Dict[str, Any]:
+    """Response body shared by /extract/pdf and the extract_pdf job."""
+    if not interventions:
+        return {"warning": "No interventions detected", "filename": filename, "count": 0, "interventions": [],
+                "sha256": sha256, "cached": cached}
+    return {"filename": filename, "count": len(interventions), "interventions": interventions,
+            "sha256": sha256, "cached": cached}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend packages (services, core, api) the way the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
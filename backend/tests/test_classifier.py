@@ -0,0 +1,137 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from services.intervention_classifier import KeywordClassifier
+
+RULEBOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rulebook.json")
+
+
+def legacy_classify(text):
+    """The hand-ordered if-chain EstimationService used before the rulebook table."""
+    t = text.lower()
+    if "speed" in t and ("limit" in t or "maximum" in t):
+        return "SPEED_LIMIT_SIGN"
+    if "no parking" in t:
+        return "REGULATORY_SIGN_NOPARK"
+    if "pedestrian" in t and "sign" in t:
+        return "INFORMATORY_SIGN"
+    if "pedestrian" in t and ("crossing" in t or "zebra" in t):
+        return "ZEBRA_CROSSING"
+    if "marking" in t or "repaint" in t or "painted" in t:
+        return "ROAD_MARKING"
+    if ("school" in t or "children" in t or "side") and "ahead" in t:
+        return "SCHOOL_AHEAD_SIGN"
+    if any(word in t for word in ["fuel", "pump", "hospital", "parking", "petrol"]):
+        return "INFORMATORY_SIGN"
+    if "stud" in t or "rpm" in t or "cat eye" in t:
+        return "ROAD_STUDS"
+    if "delineator" in t or "guide pole" in t:
+        return "DELINEATOR"
+    if "pothole" in t or "patch" in t:
+        return "POTHOLE_REPAIR"
+    if "solar blinker" in t:
+        return "SOLAR_BLINKER"
+    if "street light" in t or "streetlight" in t:
+        return "STREET_LIGHT"
+    if "FMM" in t or "fmm" in t:
+        return "FLEXIBLE_MEDIAN_MARKER"
+    return None
+
+
+FIXTURES = [
+    # one per rule
+    "Speed limit sign missing at the curve",
+    "Install maximum SPEED board",
+    "No Parking sign board damaged",
+    "Pedestrian sign faded",
+    "Pedestrian crossing not visible",
+    "Zebra markings for pedestrian movement worn out",
+    "Centre line marking faded",
+    "Repaint the edge line",
+    "Kerb not painted",
+    "School ahead warning sign missing",
+    "Children ahead",
+    "Hump ahead",
+    "Petrol pump sign missing",
+    "Hospital direction board",
+    "Fuel station board",
+    "Road studs missing",
+    "RPM damaged on median",
+    "Cat eye reflectors broken",
+    "Delineators missing on curve",
+    "Guide pole knocked down",
+    "Pothole on carriageway",
+    "Patch work required",
+    "Solar blinker not working",
+    "Street light not functioning",
+    "Streetlight pole bent",
+    "FMM missing at the U-turn",
+    # precedence conflicts
+    "Speed limit sign near no parking zone",
+    "No parking marking on the shoulder",
+    "Pedestrian crossing sign missing",
+    "Pedestrian zebra crossing repaint",
+    "Zebra crossing near school ahead",
+    "Repaint road marking near petrol pump",
+    "School ahead sign with studs",
+    "Parking area studs missing",
+    "Delineator and road stud both missing",
+    "Pothole near delineator",
+    "Patch near solar blinker",
+    "Solar blinker below street light",
+    "Street light at the FMM location",
+    "Speed breaker ahead",
+    "speed hump with maximum height",
+    "nostudparking",
+    "streetlightstreet light",
+    # no rule
+    "Vegetation clearance required",
+    "",
+    "Guardrail damaged",
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    with open(RULEBOOK_PATH, "r", encoding="utf-8") as f:
+        return KeywordClassifier.from_rulebook(json.load(f))
+
+
+def _keywords(classifier):
+    return sorted({k for _, groups in classifier.clauses for group in groups for k in group})
+
+
+@pytest.mark.parametrize("text", FIXTURES)
+def test_matches_legacy_ordering(classifier, text):
+    assert classifier.classify(text) == legacy_classify(text)
+
+
+def test_every_rule_is_covered(classifier):
+    covered = {classifier.classify(text) for text in FIXTURES}
+    assert {intervention_type for intervention_type, _ in classifier.clauses} <= covered
+
+
+def test_keyword_pairs_match_legacy_ordering(classifier):
+    # Every pair of keywords, in both orders and run together, exercises
+    # each precedence conflict and overlapping / adjacent matches
+    keywords = _keywords(classifier)
+    texts = []
+    for a, b in itertools.permutations(keywords, 2):
+        texts += [f"{a} {b}", f"{a}{b}", f"x {a.upper()} and {b} y"]
+    assert classifier.classify_batch(texts) == [legacy_classify(t) for t in texts]
+
+
+def test_batch_matches_single(classifier):
+    texts = FIXTURES + FIXTURES[::-1]
+    assert classifier.classify_batch(texts) == [classifier.classify(t) for t in texts]
+
+
+def test_keyword_prefixes_are_found():
+    # "a" and "ab" match at the same position; both must count
+    classifier = KeywordClassifier([(2, "A", [["a"], ["x"]]), (1, "AB", [["ab"]])])
+    assert classifier.classify("abx") == "A"
+    assert classifier.classify("ab") == "AB"
+    assert classifier.classify("b") is None
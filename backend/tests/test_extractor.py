@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import random
+
+import pytest
+
+import core.extractor as extractor
+from core.extractor import extract_interventions, iter_interventions, iter_pdf_lines, read_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Output of the extractor before the single-pass lexer, on the inputs below
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "extractor_golden.json")
+
+REPORTS = ["Road_Safety_Intervention_Report_Final.pdf", "my_report.pdf"]
+
+# Randomized documents: chainage ranges, to / & / To rows, split "Page N"
+# footers, header tokens, \r\n and form-feed separators
+TOKENS = [
+    "4+200", "To", "tO", " to ", "3+1 to 3+9", "missing paint", "absent", "12 + 350", "to", "TO", "&",
+    "Page", "Page 3", "page", "7", "Damaged sign board found", "missing kerb",
+    "Kerb shall be provided as per Clause 4.2 of IRC 35-2015", "install studs", "IRC:67-2022", "paint",
+    "worn out and broken", "random note", "CoERS", "Road Safety Intervention Report", "Hackathon IIT",
+    "", "  ", "Observed faded markings paint shall be", "12+0", "x Page", "2019",
+]
+SEPARATORS = ["\n", "\n", "\n", "\r\n", "\x0c", " ", "\n\n"]
+CORPUS_SIZE = 20000
+CORPUS_SEED = 1
+
+
+def corpus(size=CORPUS_SIZE, seed=CORPUS_SEED):
+    rng = random.Random(seed)
+    for _ in range(size):
+        parts = []
+        for _ in range(rng.randint(1, 40)):
+            parts.append(rng.choice(TOKENS))
+            parts.append(rng.choice(SEPARATORS))
+        yield "".join(parts)
+
+
+def corpus_digest(extract):
+    outputs = [extract(text) for text in corpus()]
+    return hashlib.sha256(json.dumps(outputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(GOLDEN_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("name", REPORTS)
+def test_bundled_reports(golden, name):
+    path = os.path.join(BACKEND_DIR, "uploads", name)
+    assert extract_interventions(read_pdf(path)) == golden["reports"][name]
+    assert list(iter_interventions(iter_pdf_lines(path))) == golden["reports"][name]
+
+
+@pytest.mark.parametrize("block_lines", [1, 3, 64])
+def test_randomized_corpus(golden, monkeypatch, block_lines):
+    # The header strip works in blocks; output must not depend on where they are cut
+    monkeypatch.setattr(extractor, "_CLEAN_BLOCK_LINES", block_lines)
+    assert golden["corpus_size"] == CORPUS_SIZE
+    assert corpus_digest(extract_interventions) == golden["corpus_sha256"]
@@ -0,0 +1,56 @@
+import time
+
+from services.job_queue import JobStore, STATUS_DONE, STATUS_QUEUED, STATUS_RUNNING
+
+
+def _store(tmp_path, lease_seconds=30.0):
+    return JobStore(str(tmp_path / "jobs.sqlite"), lease_seconds=lease_seconds)
+
+
+def test_requeue_skips_live_leases(tmp_path):
+    store = _store(tmp_path)
+    job_id = store.submit("noop", {})
+    assert store.claim(owner=111)["id"] == job_id
+
+    # Another server process starting up must not take over a running job
+    assert store.requeue_interrupted() == 0
+    assert store.get(job_id)["status"] == STATUS_RUNNING
+
+
+def test_requeue_takes_expired_leases(tmp_path):
+    store = _store(tmp_path, lease_seconds=0.05)
+    job_id = store.submit("noop", {})
+    store.claim(owner=111)
+    time.sleep(0.1)
+
+    assert store.requeue_interrupted() == 1
+    assert store.get(job_id)["status"] == STATUS_QUEUED
+
+    # The old owner no longer holds it: its late result is dropped
+    assert store.claim(owner=222)["id"] == job_id
+    assert not store.renew_lease(job_id, 111)
+    store.finish(job_id, {"from": 111}, owner=111)
+    assert store.get(job_id)["status"] == STATUS_RUNNING
+    store.finish(job_id, {"from": 222}, owner=222)
+    assert store.get(job_id, include_result=True)["result"] == {"from": 222}
+    assert store.get(job_id)["status"] == STATUS_DONE
+
+
+def test_heartbeat_keeps_lease_alive(tmp_path):
+    store = _store(tmp_path, lease_seconds=0.1)
+    job_id = store.submit("noop", {})
+    store.claim(owner=111)
+    for _ in range(3):
+        time.sleep(0.05)
+        assert store.renew_lease(job_id, 111)
+    assert store.requeue_interrupted() == 0
+
+
+def test_max_running_is_shared(tmp_path):
+    store = _store(tmp_path)
+    for _ in range(3):
+        store.submit("noop", {})
+
+    assert store.claim(owner=111, max_running=2) is not None
+    assert store.claim(owner=222, max_running=2) is not None
+    assert store.claim(owner=333, max_running=2) is None
@@ -0,0 +1,52 @@
+import math
+import os
+
+import pytest
+
+from services.quantity_estimator import QuantityEstimator
+
+RULEBOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "rulebook.json")
+
+
+@pytest.fixture(scope="module")
+def estimator():
+    return QuantityEstimator(RULEBOOK_PATH)
+
+
+def _same(a, b):
+    assert a.keys() == b.keys()
+    for code in a:
+        x, y = a[code], b[code]
+        assert (math.isnan(x) and math.isnan(y)) or x == y, code
+
+
+MIXED_VALUES = [5, 5.5, 0, -3, "5", "abc", None, True, False, [1], float("inf")]
+
+
+def test_estimate_batch_matches_estimate_on_mixed_types(estimator):
+    for intervention_type, rule in estimator.rules.items():
+        names = set()
+        for _, formula in rule.materials:
+            if formula is not None:
+                names |= formula.names
+
+        params_list = [{}]
+        for name in sorted(names):
+            for value in MIXED_VALUES:
+                params_list.append({name: value})
+        # Plain and odd rows in one batch: results must stay in input order
+        params_list.append({name: 7 for name in names})
+        params_list.append({name: "7" for name in names})
+
+        batch = estimator.estimate_batch(intervention_type, params_list)
+        for params, result in zip(params_list, batch):
+            expected = estimator.estimate(intervention_type, params)
+            assert result["params_used"] == expected["params_used"]
+            _same(result["materials"], expected["materials"])
+
+
+def test_estimate_batch_does_not_coerce_strings(estimator):
+    result = estimator.estimate_batch("ROAD_MARKING", [{"length_m": "5"}, {"length_m": None}, {"length_m": 5}])
+    assert result[0]["materials"] == {"THERMOPLASTIC_PAINT_kg": 0.0, "GLASS_BEADS_kg": 0.0}
+    assert result[1]["materials"] == {"THERMOPLASTIC_PAINT_kg": 0.0, "GLASS_BEADS_kg": 0.0}
+    assert result[2]["materials"] == {"THERMOPLASTIC_PAINT_kg": 5.5, "GLASS_BEADS_kg": 0.1875}
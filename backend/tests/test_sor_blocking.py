@@ -0,0 +1,58 @@
+import os
+import random
+
+import pytest
+
+from services.price_service import SORMatcher, normalize, read_sor_csv
+from services.sor_blocking import MIN_ROWS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOR_CSV = os.path.join(BACKEND_DIR, "data", "sor_csv", "2023", "roads.csv")
+UNITS = ["nos", "m", "m2", "kg", "cum", "rm", ""]
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    df = read_sor_csv(SOR_CSV)
+    descriptions = [str(d) for d in df["description"]]
+    units = [str(u) for u in df["unit"]]
+    rates = [1.0] * len(descriptions)
+
+    # Pad to a blocking-sized catalog with distinct rows made of the
+    # catalog's own words, so they compete for the same trigrams
+    rng = random.Random(0)
+    words = sorted({w for d in descriptions for w in d.split() if w.isalpha() and len(w) > 2})
+    while len(descriptions) < MIN_ROWS + 1000:
+        descriptions.append(" ".join(rng.sample(words, rng.randint(3, 9))))
+        units.append(rng.choice(UNITS))
+        rates.append(1.0)
+
+    queries = [d for d in df["description"].astype(str) if len(d) > 20][::15]
+    return descriptions, units, rates, queries
+
+
+def test_blocking_prunes_and_keeps_top_k(catalog):
+    descriptions, units, rates, queries = catalog
+    full = SORMatcher(descriptions, units, rates, blocking=False)
+    blocked = SORMatcher(descriptions, units, rates, blocking=True)
+    assert blocked.row_count >= MIN_ROWS
+
+    index = blocked.blocking_index()
+    candidates = index.candidates_batch([normalize(q) for q in queries])
+    pruned = [c for c in candidates if c is not None]
+    # The recall guard passes these queries and each scans a small subset
+    assert len(pruned) >= 0.9 * len(queries)
+    assert max(len(c) for c in pruned) <= index.max_candidates < blocked.row_count
+
+    query_units = [None] * len(queries)
+    assert blocked.rank_batch(queries, query_units, 3) == full.rank_batch(queries, query_units, 3)
+
+
+def test_weak_queries_fall_back_to_full_scan(catalog):
+    descriptions, units, rates, _ = catalog
+    blocked = SORMatcher(descriptions, units, rates, blocking=True)
+    full = SORMatcher(descriptions, units, rates, blocking=False)
+
+    codes = ["EPOXY_ADHESIVE", "MS_POST_65mm", "SOLAR_BLINKER_unit"]
+    assert blocked.blocking_index().candidates_batch([normalize(c) for c in codes]) == [None] * 3
+    assert blocked.match_batch(codes, ["kg", "nos", "nos"]) == full.match_batch(codes, ["kg", "nos", "nos"])
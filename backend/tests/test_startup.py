@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+from services import startup_registry
+
+
+def test_import_main_within_budget():
+    # Fresh interpreter: fails when `import main` is over budget or pulls in a heavy module
+    assert startup_registry.check_imports() == []
+
+
+class _FakePool:
+
+    def __init__(self):
+        self.events = []
+
+    def start(self):
+        self.events.append("start")
+
+    def stop(self):
+        self.events.append("stop")
+
+
+def test_lifespan_starts_and_stops_job_workers(monkeypatch):
+    import main
+
+    pool = _FakePool()
+    monkeypatch.setattr(main, "get_worker_pool", lambda: pool)
+    warmups = []
+    monkeypatch.setattr(startup_registry, "warmup_on_startup", lambda: warmups.append(True))
+
+    with TestClient(main.app) as client:
+        assert pool.events == ["start"]
+        assert warmups == [True]
+        assert client.get("/").status_code == 200
+    assert pool.events == ["start", "stop"]
@@ -0,0 +1,37 @@
+# scripts/bench_extractor.py
+"""
+Throughput of the intervention extractor (core/extractor.py) on one
+core: the bundled report's text repeated N times, best of a few runs.
+
+Run from backend/ (compare revisions by running it in each checkout):
+
+    python ../scripts/bench_extractor.py [--repeat 400] [--runs 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from core.extractor import extract_interventions, read_pdf
+
+REPORT = os.path.join("uploads", "Road_Safety_Intervention_Report_Final.pdf")
+
+parser = argparse.ArgumentParser(description="Intervention extractor throughput")
+parser.add_argument("--pdf", default=REPORT)
+parser.add_argument("--repeat", type=int, default=400, help="copies of the report text")
+parser.add_argument("--runs", type=int, default=3)
+args = parser.parse_args()
+
+text = "\n".join([read_pdf(args.pdf, workers=1)] * args.repeat)
+n_lines = len(text.splitlines())
+
+best = float("inf")
+for _ in range(args.runs):
+    started = time.perf_counter()
+    records = extract_interventions(text)
+    best = min(best, time.perf_counter() - started)
+
+print(f"{n_lines} lines, {len(records)} records: {best:.3f}s, {n_lines / best:,.0f} lines/s")